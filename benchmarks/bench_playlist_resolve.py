@@ -0,0 +1,102 @@
+"""
+Benchmark: Spotify playlist resolution vs search concurrency.
+
+Runs music.resolver.resolve_tracks against a stubbed Spotify playlist and a
+stubbed Lavalink search with fixed latency, and prints wall-clock time per
+concurrency level.
+
+Usage:
+    python benchmarks/bench_playlist_resolve.py [--tracks 50] [--latency 0.15]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import wavelink  # noqa: E402
+
+import music.resolver as resolver  # noqa: E402
+from core.config import EAGER_RESOLVE_TRACKS  # noqa: E402
+
+
+def _payload(title: str) -> dict:
+    return {
+        "encoded": f"enc:{title}",
+        "info": {
+            "identifier": title,
+            "isSeekable": True,
+            "author": "Bench Artist",
+            "length": 180000,
+            "isStream": False,
+            "position": 0,
+            "title": title,
+            "uri": None,
+            "artworkUrl": None,
+            "isrc": None,
+            "sourceName": "youtube",
+        },
+        "pluginInfo": {},
+        "userData": {},
+    }
+
+
+def _install_stubs(track_count: int, latency: float):
+    items = [
+        {"name": f"Song {i}", "artists": [{"name": "Bench Artist"}]}
+        for i in range(track_count)
+    ]
+
+    async def fake_playlist_pages(*_):
+        for start in range(0, len(items), 100):
+            yield items[start:start + 100], len(items)
+
+    resolver.spotify_playlist_pages = fake_playlist_pages
+
+    async def fake_search(query, *_, **__):
+        await asyncio.sleep(latency)
+        return [wavelink.Playable(_payload(query))]
+
+    resolver.search_tracks = fake_search
+
+
+async def _run(levels, track_count: int):
+    requester = SimpleNamespace(
+        display_name="bench",
+        discriminator="0",
+        id=1,
+        display_avatar=SimpleNamespace(url=""),
+    )
+    query = "https://open.spotify.com/playlist/bench"
+
+    print(f"{'concurrency':>11} | {'seconds':>8} | {'tracks':>6}")
+    print("-" * 32)
+    for level in levels:
+        start = time.perf_counter()
+        tracks = await resolver.resolve_tracks(query, requester, concurrency=level)
+        elapsed = time.perf_counter() - start
+
+        expected = [f"ytmsearch:Song {i} Bench Artist" for i in range(track_count)]
+        assert [t.title for t in tracks] == expected, "playlist order not preserved"
+
+        print(f"{level:>11} | {elapsed:>8.3f} | {len(tracks):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=EAGER_RESOLVE_TRACKS)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    _install_stubs(args.tracks, args.latency)
+    asyncio.run(_run(args.levels, args.tracks))
+
+
+if __name__ == "__main__":
+    main()
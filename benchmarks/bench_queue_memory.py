@@ -0,0 +1,118 @@
+"""
+Benchmark: memory per queued track, wavelink.Playable vs TrackRecord.
+
+Builds a queue of Playables the way /play does (fresh Lavalink JSON payload
+per track + requester extras), then the same queue stored as compact
+TrackRecords in a TrackQueue, and prints traced bytes per queued track.
+The TrackQueue is measured fully in memory (spilling disabled) and with
+the default spill threshold (middle of the queue on disk).
+
+Usage:
+    python benchmarks/bench_queue_memory.py [--tracks 2000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+import wavelink  # noqa: E402
+
+from music.queue import TrackQueue  # noqa: E402
+from music.resolver import _inject_requester  # noqa: E402
+
+
+def _payload_json(index: int) -> str:
+    # Shaped like a Lavalink v4 /loadtracks result
+    return json.dumps({
+        "encoded": "QAAA" + f"{index:08d}" * 30,
+        "info": {
+            "identifier": f"dQw4w{index:06d}",
+            "isSeekable": True,
+            "author": "Bench Artist - Topic",
+            "length": 212000,
+            "isStream": False,
+            "position": 0,
+            "title": f"Bench Song Number {index} (Official Audio)",
+            "uri": f"https://music.youtube.com/watch?v=dQw4w{index:06d}",
+            "artworkUrl": f"https://i.ytimg.com/vi/dQw4w{index:06d}/maxresdefault.jpg",
+            "isrc": None,
+            "sourceName": "youtube",
+        },
+        "pluginInfo": {},
+        "userData": {},
+    })
+
+
+def _requester():
+    return SimpleNamespace(
+        display_name="Bench Listener",
+        discriminator="0",
+        id=123456789012345678,
+        display_avatar=SimpleNamespace(
+            url="https://cdn.discordapp.com/avatars/123456789012345678/"
+                "a_0123456789abcdef0123456789abcdef.png?size=1024"
+        ),
+    )
+
+
+def _playables(count: int):
+    requester = _requester()
+    tracks = []
+    for index in range(count):
+        track = wavelink.Playable(json.loads(_payload_json(index)))
+        _inject_requester(track, requester)
+        tracks.append(track)
+    return tracks
+
+
+def _measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    result = build()
+    gc.collect()
+
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return result, used
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=2000)
+    args = parser.parse_args()
+
+    playables, before = _measure(lambda: _playables(args.tracks))
+    del playables
+
+    # Playables only live until they are queued (same as /play)
+    queue, after = _measure(lambda: TrackQueue(_playables(args.tracks), spill_threshold=0))
+    assert len(queue) == args.tracks
+    queue.clear()
+    del queue
+
+    spilled, after_spill = _measure(lambda: TrackQueue(_playables(args.tracks)))
+    assert len(spilled) == args.tracks
+    spilled.clear()
+
+    print(f"{'queue entry':>18} | {'bytes/track':>11} | {'total KiB':>9}")
+    print("-" * 44)
+    print(f"{'Playable':>18} | {before / args.tracks:>11.0f} | {before / 1024:>9.0f}")
+    print(f"{'TrackRecord':>18} | {after / args.tracks:>11.0f} | {after / 1024:>9.0f}")
+    print(f"{'TrackRecord+spill':>18} | {after_spill / args.tracks:>11.0f} | {after_spill / 1024:>9.0f}")
+    print(f"\nsaved: {100 * (1 - after / before):.0f}% in memory, "
+          f"{100 * (1 - after_spill / before):.0f}% with spilling")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: rate limiter memory under millions of distinct users.
+
+Replays button presses / slash commands from a stream of distinct users
+(2000 per simulated second, spread over many guilds) through the old
+ButtonCooldown and the token-bucket RateLimiter, and prints traced
+memory as the number of distinct users grows.
+
+The global bucket is opened up for the replay so that every request
+reaches the per-user and per-guild tables (worst case for memory).
+
+Usage:
+    python benchmarks/bench_rate_limiter.py [--users 2000000] [--guilds 5000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+
+from music.cooldown import RateLimiter  # noqa: E402
+
+ACTIONS = ("skip", "pause", "volume", "play", "queue", "loop")
+STEP = 0.0005  # simulated seconds between requests (2000 requests / s)
+
+
+class ButtonCooldown:
+    """The previous limiter (never forgets a user), for comparison"""
+
+    def __init__(self):
+        self._cooldowns = defaultdict(dict)
+
+    def check(self, user_id: int, action: str, cooldown: float):
+        now = time.monotonic()
+        last_used = self._cooldowns[user_id].get(action)
+        if last_used and (now - last_used) < cooldown:
+            return round(cooldown - (now - last_used), 1)
+        self._cooldowns[user_id][action] = now
+        return None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _replay(check, users: int, guilds: int, report_every: int, clock=None):
+    rows = []
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    for user in range(1, users + 1):
+        if clock is not None:
+            clock.now += STEP
+        check(user, user % guilds, ACTIONS[user % len(ACTIONS)])
+
+        if user % report_every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            rows.append((user, current, peak))
+
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return rows, elapsed
+
+
+def _print(name: str, rows, elapsed: float, users: int, extra=""):
+    print(f"\n{name}  ({users / elapsed:,.0f} checks/s under tracemalloc){extra}")
+    print(f"{'users':>10} | {'current MiB':>11} | {'peak MiB':>8}")
+    print("-" * 36)
+    for user, current, peak in rows:
+        print(f"{user:>10,} | {current / 2**20:>11.1f} | {peak / 2**20:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2_000_000)
+    parser.add_argument("--guilds", type=int, default=5000)
+    parser.add_argument("--old-users", type=int, default=500_000,
+                        help="distinct users replayed through ButtonCooldown")
+    args = parser.parse_args()
+
+    clock = FakeClock()
+    limiter = RateLimiter(global_limit=(float("inf"), float("inf")), clock=clock)
+    rows, elapsed = _replay(
+        limiter.check, args.users, args.guilds, max(1, args.users // 8), clock
+    )
+    stats = limiter.stats()
+    _print(
+        "RateLimiter", rows, elapsed, args.users,
+        f"\nend: {stats['user_buckets']:,} user / {stats['guild_buckets']:,} guild buckets, "
+        f"{stats['limited']:,} limited",
+    )
+
+    old = ButtonCooldown()
+    rows, elapsed = _replay(
+        lambda user, _, action: old.check(user, action, 3),
+        args.old_users, args.guilds, max(1, args.old_users // 4),
+    )
+    _print("ButtonCooldown (old)", rows, elapsed, args.old_users)
+
+
+if __name__ == "__main__":
+    main()
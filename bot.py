@@ -8,118 +8,72 @@ from core.bot import bot, tree
 from core.config import TOKEN
 from core.lavalink import connect_lavalink
 from web.keep_alive import run_server
+from services.spotify import spotify
 
 import commands.play
 import commands.basic
 import commands.info
 
 from music.state import music_states
-from music.embed import build_player_embed
-from music.controls import MusicControlView
-from music.autoplay import get_autoplay_track
+from music.recommender import recommender
+from music.controls import register_controls
+from music.cooldown import cooldown_embed, rate_limiter
 
 
 # ============================================================
-# WAVELINK TRACK END HANDLER (PRODUCTION SAFE)
+# WAVELINK EVENTS → PER-GUILD PLAYBACK ACTOR
 # ============================================================
+def _actor_for(player: wavelink.Player):
+    guild = getattr(player, "guild", None)
+    state = music_states.get(guild.id) if guild else None
+    return state.actor if state else None
+
+
 @bot.listen("on_wavelink_track_end")
 async def on_wavelink_track_end(payload: wavelink.TrackEndEventPayload):
-    player: wavelink.Player = payload.player
-    guild = getattr(player, "guild", None)
+    actor = _actor_for(payload.player)
+    if actor:
+        actor.post("end", payload)
+
 
-    if not player or not guild:
-        return
-
-    guild_id = guild.id
-    state = music_states.get(guild_id)
-    if not state:
-        return
-
-    # --------------------------------------------------
-    # 🔁 LOOP MODE
-    # --------------------------------------------------
-    if state.loop and state.current:
-        await player.play(state.current)
-        return
-
-    # --------------------------------------------------
-    # 📜 QUEUE MODE
-    # --------------------------------------------------
-    if state.queue:
-        state.previous = state.current
-        state.current = state.queue.pop(0)
-        state.autoplay_seed = state.current
-        state.manual_action = None
-
-        await player.play(state.current)
-        await _update_panel(state, player, guild_id)
-        return
-
-    # --------------------------------------------------
-    # 🔄 AUTOPLAY MODE
-    # --------------------------------------------------
-    if state.autoplay:
-        if state.manual_action == "back":
-            # ⏮ back was one-time only → resume autoplay next
-            state.manual_action = None
-        else:
-            next_track = await get_autoplay_track(state)
-            if next_track:
-                state.previous = state.current
-                state.current = next_track
-                state.autoplay_seed = next_track
-
-                await player.play(next_track)
-                await _update_panel(state, player, guild_id)
-                return
-
-    # --------------------------------------------------
-    # 🧹 CLEANUP (REAL END ONLY)
-    # --------------------------------------------------
-    if state.manual_action:
-        state.manual_action = None
-        return
-
-    await cleanup_player(player, state, guild_id)
+@bot.listen("on_wavelink_track_start")
+async def on_wavelink_track_start(payload: wavelink.TrackStartEventPayload):
+    # Autoplay look-ahead, recommender, history and lyrics prefetch
+    actor = _actor_for(payload.player)
+    if actor:
+        actor.post("start", payload)
 
 
 # ============================================================
-# UPDATE CONTROL PANEL
+# SLASH COMMAND RATE LIMITS (SHARED WITH THE PANEL BUTTONS)
 # ============================================================
-async def _update_panel(state, player, guild_id):
-    if state.message:
-        try:
-            await state.message.edit(
-                embed=build_player_embed(state),
-                view=MusicControlView(player, guild_id),
-            )
-        except Exception:
-            pass
+async def _command_rate_limit(interaction: discord.Interaction) -> bool:
+    # Autocomplete keystrokes are not commands
+    if interaction.type is discord.InteractionType.autocomplete:
+        return True
+
+    command = interaction.command.name if interaction.command else "command"
+    remaining = rate_limiter.check(interaction.user.id, interaction.guild_id, command)
+    if remaining is None:
+        return True
+
+    await interaction.response.send_message(embed=cooldown_embed(remaining), ephemeral=True)
+    return False
+
+
+tree.interaction_check = _command_rate_limit
 
 
 # ============================================================
-# CLEANUP PLAYER
+# SETUP (BEFORE THE GATEWAY CONNECTS)
 # ============================================================
-async def cleanup_player(player: wavelink.Player, state, guild_id: int):
-    try:
-        await player.disconnect(force=True)
-    except Exception:
-        pass
+async def _setup_hook():
+    # Persisted track ids must be loaded before any /play can record
+    # a transition (commands from the last run are already registered)
+    await recommender.load()
 
-    if state.message:
-        try:
-            await state.message.edit(
-                embed=discord.Embed(
-                    title="Playback Finished",
-                    description="Queue ended. Playback stopped.",
-                    color=discord.Color.red(),
-                ),
-                view=None,
-            )
-        except Exception:
-            pass
 
-    music_states.pop(guild_id, None)
+bot.setup_hook = _setup_hook
 
 
 # ============================================================
@@ -127,6 +81,9 @@ async def cleanup_player(player: wavelink.Player, state, guild_id: int):
 # ============================================================
 @bot.event
 async def on_ready():
+    # One persistent control view for every panel (also old ones)
+    register_controls(bot)
+
     print("🔌 Connecting Lavalink...")
     await connect_lavalink(bot)
 
@@ -155,6 +112,11 @@ async def shutdown():
         except Exception:
             pass
 
+    if spotify:
+        await spotify.close()
+
+    recommender.close()
+
     await bot.close()
 
 
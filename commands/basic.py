@@ -1,10 +1,25 @@
 from discord import Interaction, Embed, Color
-import random
 import wavelink
 
 from music.state import music_states
-from music.embed import build_player_embed
-from music.controls import MusicControlView
+from music.controls import settle
+from music.resolver import prefetch_queue
+
+
+def _player_changed(interaction: Interaction, mode: str, value):
+    # Pause / volume live on the player; the state version still moves
+    state = music_states.get(interaction.guild.id)
+    if state:
+        state.toggled(mode, value)
+
+
+def _not_applied(setting: str, dropped: bool) -> Embed:
+    # The actor never got the request, or is still busy with a transition
+    if dropped:
+        description = f"Too many requests right now; the {setting} request was dropped. Try again in a moment."
+    else:
+        description = f"The player is busy; {setting} will change once the current transition finishes."
+    return Embed(title="Player Busy", description=description, color=Color.orange())
 
 
 def setup(tree):
@@ -58,24 +73,47 @@ def setup(tree):
                 ephemeral=True,
             )
 
-        try:
-            await player.disconnect(force=True)
-        except Exception:
-            pass
+        # Edits + the actor's stop can take longer than Discord's 3s ack
+        await interaction.response.defer()
 
+        # Stop waiting on a playlist that is still resolving; otherwise
+        # stop would queue up behind the very wait it is meant to end
         if state:
-            if state.message:
-                try:
-                    await state.message.edit(embed=None, view=None)
-                except Exception:
-                    pass
-            state.reset()
-            music_states.pop(guild.id, None)
-
-        await interaction.response.send_message(
+            state.cancel_resolve()
+
+        if state and state.panel:
+            state.panel.cancel()
+
+        if state and state.message:
+            try:
+                await state.message.edit(embed=None, view=None)
+            except Exception:
+                pass
+
+        # The actor disconnects and drops the session in order
+        stopped = True
+        if state and state.actor:
+            future = state.actor.post("stop")
+            await settle(future)
+            stopped = future is None or future.done()
+        else:
+            try:
+                await player.disconnect(force=True)
+            except Exception:
+                pass
+
+            if state:
+                state.reset()
+                music_states.pop(guild.id, None)
+
+        await interaction.followup.send(
             embed=Embed(
-                title="Disconnected",
-                description="Left the voice channel.",
+                title="Disconnected" if stopped else "Disconnecting",
+                description=(
+                    "Left the voice channel."
+                    if stopped
+                    else "Leaving once the current transition finishes."
+                ),
                 color=Color.red(),
             )
         )
@@ -95,6 +133,7 @@ def setup(tree):
             )
 
         await player.pause(True)
+        _player_changed(interaction, "paused", True)
         await interaction.response.send_message(
             embed=Embed(
                 title="Playback Paused",
@@ -118,6 +157,7 @@ def setup(tree):
             )
 
         await player.pause(False)
+        _player_changed(interaction, "paused", False)
         await interaction.response.send_message(
             embed=Embed(
                 title="Playback Resumed",
@@ -130,7 +170,8 @@ def setup(tree):
     @tree.command(name="skip", description="Skip the current track")
     async def skip(interaction: Interaction):
         player: wavelink.Player = interaction.guild.voice_client
-        if not player or not player.playing:
+        state = music_states.get(interaction.guild.id)
+        if not player or not player.playing or not state or not state.actor:
             return await interaction.response.send_message(
                 embed=Embed(
                     title="Nothing Playing",
@@ -140,7 +181,11 @@ def setup(tree):
                 ephemeral=True,
             )
 
-        await player.stop()
+        if state.actor.post("skip", state.current) is None:
+            return await interaction.response.send_message(
+                embed=_not_applied("skip", dropped=True), ephemeral=True
+            )
+
         await interaction.response.send_message(
             embed=Embed(
                 title="Track Skipped",
@@ -165,6 +210,7 @@ def setup(tree):
 
         level = max(1, min(200, level))
         await player.set_volume(level)
+        _player_changed(interaction, "volume", level)
 
         await interaction.response.send_message(
             embed=Embed(
@@ -216,7 +262,8 @@ def setup(tree):
                 ephemeral=True,
             )
 
-        random.shuffle(state.queue)
+        state.queue.shuffle()
+        prefetch_queue(state.queue)
         await interaction.response.send_message(
             embed=Embed(
                 title="Queue Shuffled",
@@ -229,9 +276,8 @@ def setup(tree):
     @tree.command(name="loop", description="Toggle loop mode")
     async def loop(interaction: Interaction):
         state = music_states.get(interaction.guild.id)
-        player = interaction.guild.voice_client
 
-        if not state:
+        if not state or not state.actor:
             return await interaction.response.send_message(
                 embed=Embed(
                     title="No Session",
@@ -241,28 +287,27 @@ def setup(tree):
                 ephemeral=True,
             )
 
-        state.loop = not state.loop
+        future = state.actor.post("loop")
+        enabled = await settle(future)
+        if enabled is None:
+            return await interaction.response.send_message(
+                embed=_not_applied("loop", dropped=future is None), ephemeral=True
+            )
+
         await interaction.response.send_message(
             embed=Embed(
                 title="Loop Mode",
-                description=f"Loop is now **{'ENABLED' if state.loop else 'DISABLED'}**.",
-                color=Color.green() if state.loop else Color.red(),
+                description=f"Loop is now **{'ENABLED' if enabled else 'DISABLED'}**.",
+                color=Color.green() if enabled else Color.red(),
             )
         )
 
-        if state.message and player:
-            await state.message.edit(
-                embed=build_player_embed(state),
-                view=MusicControlView(player, interaction.guild.id),
-            )
-
     # ------------------ /autoplay ------------------
     @tree.command(name="autoplay", description="Toggle autoplay mode")
     async def autoplay(interaction: Interaction):
         state = music_states.get(interaction.guild.id)
-        player = interaction.guild.voice_client
 
-        if not state:
+        if not state or not state.actor:
             return await interaction.response.send_message(
                 embed=Embed(
                     title="No Session",
@@ -272,24 +317,21 @@ def setup(tree):
                 ephemeral=True,
             )
 
-        state.autoplay = not state.autoplay
-        if state.autoplay and not state.autoplay_seed and state.current:
-            state.autoplay_seed = state.current
+        future = state.actor.post("autoplay")
+        enabled = await settle(future)
+        if enabled is None:
+            return await interaction.response.send_message(
+                embed=_not_applied("autoplay", dropped=future is None), ephemeral=True
+            )
 
         await interaction.response.send_message(
             embed=Embed(
                 title="Autoplay",
-                description=f"Autoplay is now **{'ENABLED' if state.autoplay else 'DISABLED'}**.",
-                color=Color.green() if state.autoplay else Color.red(),
+                description=f"Autoplay is now **{'ENABLED' if enabled else 'DISABLED'}**.",
+                color=Color.green() if enabled else Color.red(),
             )
         )
 
-        if state.message and player:
-            await state.message.edit(
-                embed=build_player_embed(state),
-                view=MusicControlView(player, interaction.guild.id),
-            )
-
     # ------------------ /clear ------------------
     @tree.command(name="clear", description="Clear the music queue")
     async def clear(interaction: Interaction):
@@ -304,6 +346,7 @@ def setup(tree):
                 ephemeral=True,
             )
 
+        state.cancel_resolve()
         state.queue.clear()
         await interaction.response.send_message(
             embed=Embed(
@@ -1,6 +1,44 @@
-from discord import Interaction, Embed
+from discord import Interaction, Embed, app_commands
+from music.autoplay import autoplay_stats
+from music.cooldown import rate_limiter
+from music.embed import render_stats
+from music.events import event_metrics
+from music.panel import panel_stats
+from music.progress import progress_scheduler
+from music.recommender import recommender
+from music.search import search_flight
+from music.search_cache import search_cache
 from music.state import music_states
-from services.genius import genius
+from music.transitions import transition_monitor
+from services.genius import lyrics_cache, lyrics_pool
+
+
+def _format_stats(stats: dict, indent: str = "") -> str:
+    """Compact text for a stats() dict (histograms on one line)"""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, dict) and "p95" in value:
+            lines.append(
+                f"{indent}{key}: n={value['count']} p50={value['p50']:.0f} "
+                f"p95={value['p95']:.0f} max={value['max']:.0f}"
+            )
+        elif isinstance(value, dict):
+            lines.append(f"{indent}{key}:")
+            lines.append(_format_stats(value, indent + "  "))
+        elif isinstance(value, (list, tuple)):
+            lines.append(f"{indent}{key}: {len(value)}")
+        elif isinstance(value, float):
+            lines.append(f"{indent}{key}: {value:.1f}")
+        else:
+            lines.append(f"{indent}{key}: {value}")
+    return "\n".join(line for line in lines if line)
+
+
+def _stats_field(embed: Embed, name: str, *sections: dict):
+    text = "\n".join(_format_stats(section) for section in sections) or "-"
+    if len(text) > 1000:
+        text = text[:997] + "…"
+    embed.add_field(name=name, value=f"```{text}```", inline=False)
 
 
 def setup(tree):
@@ -79,12 +117,16 @@ def setup(tree):
             color=0x5865F2,
         )
 
+        # Whole-queue ETA from the queue's running total
+        total = state.queue.duration // 1000
+        eta = f"{total // 3600}:{total // 60 % 60:02d}:{total % 60:02d}"
+
         if len(state.queue) > 10:
             embed.set_footer(
-                text=f"And {len(state.queue) - 10} more tracks in queue..."
+                text=f"And {len(state.queue) - 10} more tracks in queue... • Total {eta}"
             )
         else:
-            embed.set_footer(text="Queue • Music System")
+            embed.set_footer(text=f"Queue • Total {eta} • Music System")
 
         await interaction.response.send_message(embed=embed)
 
@@ -148,6 +190,33 @@ def setup(tree):
         embed.set_footer(text="Favorites • Music System")
         await interaction.response.send_message(embed=embed)
 
+    # ==================================================
+    # /stats (ADMIN)
+    # ==================================================
+    @tree.command(name="stats", description="Show music system metrics")
+    @app_commands.default_permissions(manage_guild=True)
+    async def stats(interaction: Interaction):
+        state = music_states.get(interaction.guild.id)
+        actor = state.actor if state else None
+
+        embed = Embed(title="📊 Music System Stats", color=0x5865F2)
+        _stats_field(embed, "🎛 Playback (this server)", actor.stats() if actor else {"actor": "idle"})
+        _stats_field(embed, "⏱ Transitions", transition_monitor.stats())
+        _stats_field(embed, "🔄 Autoplay", autoplay_stats.stats(), recommender.stats())
+        _stats_field(embed, "🔎 Search", search_flight.stats(), search_cache.stats())
+        _stats_field(embed, "🎤 Lyrics", lyrics_pool.stats(), lyrics_cache.stats())
+        _stats_field(
+            embed,
+            "🖼 Panel",
+            panel_stats.stats(),
+            {"render_cache": render_stats.stats(), "progress": progress_scheduler.stats()},
+            {"events": event_metrics.stats()},
+        )
+        _stats_field(embed, "⏳ Rate limits", rate_limiter.stats())
+
+        embed.set_footer(text=f"{len(music_states)} active sessions • Music System")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     # ==================================================
     # /lyrics
     # ==================================================
@@ -167,14 +236,10 @@ def setup(tree):
                 ephemeral=True,
             )
 
-        try:
-            song = genius.search_song(
-                state.current.title,
-                state.current.author,
-            )
-        except Exception as e:
-            print("[GENIUS ERROR]", e)
-            song = None
+        song = await lyrics_cache.get(
+            state.current.title,
+            state.current.author,
+        )
 
         if not song or not song.lyrics:
             return await interaction.followup.send(
@@ -1,11 +1,13 @@
 import discord
 import wavelink
 
+from core.config import MAX_QUEUE_LENGTH
 from core.lavalink import node_ready
 from music.state import MusicState, music_states
-from music.resolver import resolve_tracks
-from music.controls import MusicControlView
-from music.embed import build_player_embed
+from music.resolver import iter_tracks, materialize, plan_query
+from music.player import attach_actor, start_enqueue, wait_teardown
+from music.controls import panel_view
+from music.embed import cached_player_embed
 
 
 def setup(tree):
@@ -57,6 +59,9 @@ def setup(tree):
         # ==================================================
         # CONNECT / FETCH PLAYER (SAFE)
         # ==================================================
+        # A session that is stopping disconnects first
+        await wait_teardown(guild.id)
+
         player: wavelink.Player = guild.voice_client
 
         if not player:
@@ -73,23 +78,28 @@ def setup(tree):
         # ==================================================
         state: MusicState = music_states.setdefault(
             guild.id,
-            MusicState(),
+            MusicState(guild.id),
         )
         state.player = player
-
-        # Reset manual flag on new /play
-        state.manual_action = False
+        actor = attach_actor(state, guild.id)
 
         # ==================================================
-        # RESOLVE TRACKS (SAFE)
+        # RESOLVE FIRST TRACK (SAFE, STREAMED)
         # ==================================================
+        stream = None
+        first_track = None
+
         try:
-            tracks = await resolve_tracks(query, user)
+            plan = await plan_query(query, user)
+            stream = iter_tracks(plan, user)
+            first_track = await anext(stream, None)
         except Exception as e:
             print("[RESOLVE ERROR]", e)
-            tracks = None
 
-        if not tracks:
+        if not first_track:
+            if stream:
+                await stream.aclose()
+
             return await interaction.followup.send(
                 embed=discord.Embed(
                     title="❌ No Results Found",
@@ -107,51 +117,83 @@ def setup(tree):
         # ==================================================
         player_is_playing = bool(player.playing or player.paused)
 
+        if player_is_playing and len(state.queue) >= MAX_QUEUE_LENGTH:
+            await stream.aclose()
+            return await interaction.followup.send(
+                embed=discord.Embed(
+                    title="📥 Queue Full",
+                    description=(
+                        f"The queue is limited to **{MAX_QUEUE_LENGTH}** tracks.\n\n"
+                        "Wait for some tracks to finish or use `/clear`."
+                    ),
+                    color=discord.Color.orange(),
+                ),
+                ephemeral=True,
+            )
+
         started_playback = False
         queued_only = True
+        head = []
+
+        # ▶ CASE 1: PLAYER IDLE → PLAY IMMEDIATELY (via the actor)
+        if not player_is_playing:
+            # Placeholders come last in a stream: if every eager search
+            # failed, the first entry still needs its own search
+            playable = await materialize(first_track)
+
+            started = None
+            if playable:
+                future = actor.post("play", playable)
+                if future is None:
+                    state.queue.append(playable)  # mailbox full → queue it
+                    started = False
+                else:
+                    # None: the actor failed to start it (or was stopped)
+                    started = await future
+
+            if started is None:
+                await stream.aclose()
+                return await interaction.followup.send(
+                    embed=discord.Embed(
+                        title="❌ Playback Failed",
+                        description=(
+                            "The track could not be started.\n\n"
+                            "Try again, or try another song name or URL."
+                        ),
+                        color=discord.Color.red(),
+                    ),
+                    ephemeral=True,
+                )
 
-        for track in tracks:
-
-            # ▶ CASE 1: PLAYER IDLE → PLAY IMMEDIATELY
-            if not player_is_playing and not started_playback:
-                # Update previous safely
-                state.previous = state.current
-                state.current = track
-
-                await player.play(track)
+            started_playback = started
+            queued_only = not started_playback
 
-                # Autoplay seed ONLY for actually played track
-                state.autoplay_seed = track
+        # 📥 CASE 2: PLAYER ACTIVE, PLAYLIST STILL LOADING → QUEUE BEHIND IT
+        elif state.is_resolving():
+            head = [first_track]
 
-                started_playback = True
-                queued_only = False
+        # 📥 CASE 3: PLAYER ACTIVE → QUEUE ONLY
+        else:
+            state.queue.append(first_track)
+            state.invalidate_autoplay()
 
-            # 📥 CASE 2: PLAYER ACTIVE → QUEUE ONLY
-            else:
-                state.queue.append(track)
+        # 📜 REST OF PLAYLIST → BACKGROUND, IN ORDER
+        if plan.total > 1 or head:
+            start_enqueue(state, player, stream, plan.total, head)
+        else:
+            await stream.aclose()
 
         # ==================================================
         # CONTROL PANEL UPDATE (UNIFIED)
         # ==================================================
-        embed = build_player_embed(state)
-        view = MusicControlView(player, guild.id)
-
-        try:
-            if not state.message:
-                state.message = await interaction.followup.send(
-                    embed=embed,
-                    view=view,
-                )
-            else:
-                await state.message.edit(
-                    embed=embed,
-                    view=view,
-                )
-        except Exception:
+        # An existing panel follows the state events on its own
+        if not state.message:
             state.message = await interaction.followup.send(
-                embed=embed,
-                view=view,
+                embed=cached_player_embed(state),
+                view=panel_view(guild.id),
             )
+            if state.panel:
+                state.panel.forget()
 
         # ==================================================
         # AUTO-CORRECT NOTICE (OPTIONAL)
@@ -187,6 +229,9 @@ def setup(tree):
                     description=(
                         "Your requested track has been **added to the queue**.\n\n"
                         "It will play automatically after the current song."
+                        if plan.total == 1 else
+                        f"Your playlist (**{plan.total}** tracks) is being **added to the queue** in order.\n\n"
+                        "Progress is shown on the control panel."
                     ),
                     color=discord.Color.blurple(),
                 ),
@@ -39,3 +39,126 @@ LAVALINK_NODES = [
         "secure": LAVALINK_SECURE,
     }
 ]
+
+# ============================================================
+# RESOLVER
+# ============================================================
+# Max concurrent Lavalink searches while resolving one playlist
+RESOLVER_CONCURRENCY = max(1, int(os.getenv("RESOLVER_CONCURRENCY", 8)))
+
+# Spotify playlist items searched up front (the eager window); the rest
+# are queued as lazy placeholders
+EAGER_RESOLVE_TRACKS = int(os.getenv("EAGER_RESOLVE_TRACKS", 50))
+# Playlist cap (items past this are not queued at all)
+PLAYLIST_MAX_TRACKS = int(os.getenv("PLAYLIST_MAX_TRACKS", 1000))
+# Placeholders are resolved this many positions before the queue head
+QUEUE_LOOKAHEAD = int(os.getenv("QUEUE_LOOKAHEAD", 3))
+# Per-guild queue cap (playlist enqueue stops here)
+MAX_QUEUE_LENGTH = int(os.getenv("MAX_QUEUE_LENGTH", 2000))
+
+# ============================================================
+# SEARCH CACHE
+# ============================================================
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+SEARCH_CACHE_PATH = os.getenv(
+    "SEARCH_CACHE_PATH", os.path.join(DATA_DIR, "search_cache.sqlite3")
+)
+SEARCH_CACHE_MEMORY_SIZE = int(os.getenv("SEARCH_CACHE_MEMORY_SIZE", 4096))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 7 * 24 * 3600))
+SEARCH_CACHE_NEGATIVE_TTL = int(os.getenv("SEARCH_CACHE_NEGATIVE_TTL", 15 * 60))
+
+# ============================================================
+# SPOTIFY → LAVALINK MATCH INDEX
+# ============================================================
+MATCH_INDEX_PATH = os.getenv(
+    "MATCH_INDEX_PATH", os.path.join(DATA_DIR, "match_index.sqlite3")
+)
+MATCH_INDEX_MEMORY_SIZE = int(os.getenv("MATCH_INDEX_MEMORY_SIZE", 8192))
+
+# ============================================================
+# LYRICS WORKERS
+# ============================================================
+GENIUS_WORKERS = max(1, int(os.getenv("GENIUS_WORKERS", 2)))
+GENIUS_MAX_PENDING = max(1, int(os.getenv("GENIUS_MAX_PENDING", 8)))
+GENIUS_REQUEST_TIMEOUT = float(os.getenv("GENIUS_REQUEST_TIMEOUT", 25))
+
+# ============================================================
+# LYRICS CACHE
+# ============================================================
+LYRICS_CACHE_PATH = os.getenv(
+    "LYRICS_CACHE_PATH", os.path.join(DATA_DIR, "lyrics_cache.sqlite3")
+)
+LYRICS_CACHE_MEMORY_SIZE = int(os.getenv("LYRICS_CACHE_MEMORY_SIZE", 256))
+LYRICS_CACHE_TTL = int(os.getenv("LYRICS_CACHE_TTL", 30 * 24 * 3600))
+LYRICS_CACHE_NEGATIVE_TTL = int(os.getenv("LYRICS_CACHE_NEGATIVE_TTL", 24 * 3600))
+# Queue entries whose lyrics are prefetched when a track starts
+LYRICS_PREFETCH = int(os.getenv("LYRICS_PREFETCH", 2))
+# Background prefetches allowed at once (always below GENIUS_WORKERS,
+# so /lyrics keeps a free worker); prefetches are skipped when busy
+LYRICS_PREFETCH_SLOTS = max(0, min(GENIUS_WORKERS - 1, int(os.getenv("LYRICS_PREFETCH_SLOTS", 1))))
+
+# ============================================================
+# AUTOPLAY RECOMMENDER
+# ============================================================
+RECOMMENDER_PATH = os.getenv(
+    "RECOMMENDER_PATH", os.path.join(DATA_DIR, "recommender.sqlite3")
+)
+# Rebuild the sparse matrix after this many new transitions
+RECOMMENDER_REBUILD_EVERY = int(os.getenv("RECOMMENDER_REBUILD_EVERY", 200))
+RECOMMENDER_MAX_TRACKS = int(os.getenv("RECOMMENDER_MAX_TRACKS", 200_000))
+# Stored transitions; above this the weakest are dropped
+RECOMMENDER_MAX_EDGES = int(os.getenv("RECOMMENDER_MAX_EDGES", 1_000_000))
+
+# ============================================================
+# AUTOPLAY HISTORY
+# ============================================================
+# Autoplay never picks a song played within the last N tracks
+AUTOPLAY_HISTORY_SIZE = int(os.getenv("AUTOPLAY_HISTORY_SIZE", 50))
+
+# ============================================================
+# QUEUE SPILL (VERY LARGE QUEUES)
+# ============================================================
+# Queues longer than this keep only a head / tail window in memory;
+# the middle is spilled to a per-guild segment file (0 disables)
+QUEUE_SPILL_THRESHOLD = int(os.getenv("QUEUE_SPILL_THRESHOLD", 500))
+QUEUE_SPILL_WINDOW = max(QUEUE_LOOKAHEAD, int(os.getenv("QUEUE_SPILL_WINDOW", 50)))
+QUEUE_SPILL_DIR = os.getenv("QUEUE_SPILL_DIR", os.path.join(DATA_DIR, "queues"))
+
+# ============================================================
+# TRANSITION GAP SLO
+# ============================================================
+# Silence between track end and the next track start above this
+# is counted as a breach for the guild
+TRANSITION_GAP_SLO_MS = float(os.getenv("TRANSITION_GAP_SLO_MS", 2000))
+
+# ============================================================
+# CONTROL PANEL UPDATES
+# ============================================================
+# Changes inside this window are merged into one message edit
+PANEL_DEBOUNCE = float(os.getenv("PANEL_DEBOUNCE", 0.5))
+# Minimum spacing between edits of one panel (Discord allows ~5 / 5s)
+PANEL_MIN_INTERVAL = float(os.getenv("PANEL_MIN_INTERVAL", 1.0))
+
+# ============================================================
+# PLAYBACK PROGRESS
+# ============================================================
+# Cells in the panel's progress bar; a refresh is due when it advances
+PROGRESS_BAR_WIDTH = int(os.getenv("PROGRESS_BAR_WIDTH", 12))
+# Refresh interval bounds per panel (adaptive to track length)
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", 10))
+PROGRESS_MAX_INTERVAL = float(os.getenv("PROGRESS_MAX_INTERVAL", 60))
+# Scheduler slot length and progress refreshes allowed per slot (all guilds)
+PROGRESS_SLOT = float(os.getenv("PROGRESS_SLOT", 1.0))
+PROGRESS_SLOT_BUDGET = int(os.getenv("PROGRESS_SLOT_BUDGET", 10))
+
+# ============================================================
+# RATE LIMITS (BUTTONS + SLASH COMMANDS)
+# ============================================================
+# Token buckets: burst capacity and refill rate (tokens / second)
+RATE_GUILD_CAPACITY = float(os.getenv("RATE_GUILD_CAPACITY", 30))
+RATE_GUILD_REFILL = float(os.getenv("RATE_GUILD_REFILL", 3))
+RATE_GLOBAL_CAPACITY = float(os.getenv("RATE_GLOBAL_CAPACITY", 100))
+RATE_GLOBAL_REFILL = float(os.getenv("RATE_GLOBAL_REFILL", 40))
+# Buckets kept in memory per scope (idle / least recent are evicted)
+RATE_MAX_BUCKETS = int(os.getenv("RATE_MAX_BUCKETS", 50_000))
@@ -0,0 +1,56 @@
+import bisect
+
+# Upper bounds in milliseconds; the last bucket is open-ended
+DEFAULT_BUCKETS = (
+    5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000, 30000,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram (milliseconds)
+    Constant memory; percentiles report the bucket upper bound
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        value_ms = float(value_ms)
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = p / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index < len(self.buckets):
+                    return min(float(self.buckets[index]), self.max)
+                return self.max
+
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
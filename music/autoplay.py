@@ -1,5 +1,49 @@
+import asyncio
 import random
+import time
+from typing import Optional
+
 import wavelink
+from core.metrics import Histogram
+from music.history import title_key
+from music.recommender import recommender
+from music.search import search_tracks
+
+
+class AutoplayStats:
+    """
+    Autoplay look-ahead metrics
+    saved_gap: dead air avoided per precomputed pick (ms)
+    """
+
+    def __init__(self):
+        self.saved_gap = Histogram()
+        self.searches = 0
+        self.draws = 0
+        self.precomputed = 0
+        self.used = 0
+        self.discarded = 0
+        self.cold = 0
+
+    def stats(self) -> dict:
+        return {
+            "searches": self.searches,
+            "draws": self.draws,
+            "precomputed": self.precomputed,
+            "used": self.used,
+            "discarded": self.discarded,
+            "cold": self.cold,
+            "saved_gap_ms": self.saved_gap.snapshot(),
+        }
+
+
+# GLOBAL INSTANCE
+autoplay_stats = AutoplayStats()
+
+
+def seed_key(track) -> Optional[str]:
+    """Identity used to match a precomputed pick to its seed"""
+    return getattr(track, "identifier", None) or getattr(track, "title", None)
 
 
 async def get_autoplay_track(state):
@@ -8,10 +52,9 @@ async def get_autoplay_track(state):
 
     Flow:
     1. Use autoplay_seed (last actually played track) or current
-    2. Search similar tracks via YouTube Music
-    3. Fallback to artist-only search
-    4. Never repeat the same track
-    5. Rotate seed so autoplay continues naturally
+    2. Take the look-ahead pick if it was computed for this seed
+    3. Otherwise draw from the candidate pool now (cold path)
+    4. Rotate seed so autoplay continues naturally
     """
 
     # --------------------------------------------------
@@ -21,50 +64,228 @@ async def get_autoplay_track(state):
     if not seed:
         return None
 
+    # --------------------------------------------------
+    # 2. LOOK-AHEAD PICK (computed while the seed played)
+    # --------------------------------------------------
+    pick = await _take_precomputed(state, seed)
+
+    if pick is None:
+        autoplay_stats.cold += 1
+        pick = await find_autoplay_track(state, seed)
+
+    # --------------------------------------------------
+    # 3. ROTATE SEED (CRITICAL)
+    # --------------------------------------------------
+    if pick:
+        state.autoplay_seed = pick
+
+    return pick
+
+
+async def find_autoplay_track(state, seed) -> Optional[wavelink.Playable]:
+    """
+    Pick a track similar to seed
+    1. Ask the local co-occurrence recommender (no network)
+    2. Cold start: draw from the guild's candidate pool
+    3. Refill the pool (similar song + artist search) only when it
+       runs low or the seed drifted away from it
+    4. Never repeat a track from the guild's recent history window
+    """
+
+    history = state.recent
+    pool = state.autoplay_pool
+    if pool is None or pool.drifted(seed):
+        pool = state.autoplay_pool = CandidatePool(seed)
+
+    pick = recommender.recommend(
+        seed,
+        skip=lambda track: track in history or seed_key(track) in pool.lineage,
+    )
+    if pick:
+        pool.lineage.add(seed_key(pick))
+        pool.seen.add(title_key(pick.title))
+    else:
+        pool.prune(history)
+        if len(pool) < POOL_LOW_WATERMARK:
+            await _refill(pool, seed, history)
+        pick = pool.draw(seed)
+
+    if not pick:
+        return None
+
+    autoplay_stats.draws += 1
+
+    # --------------------------------------------------
+    # SAFE EXTRAS HANDLING (Wavelink v2/v3)
+    # --------------------------------------------------
+    if not hasattr(pick, "extras") or not pick.extras:
+        pick.extras = {}
+
+    pick.extras.autoplay = True
+
+    return pick
+
+
+async def _refill(pool, seed, history):
     queries = [
         f"{seed.title} {seed.author}",  # similar song
         f"{seed.author}",  # artist fallback
     ]
 
     # --------------------------------------------------
-    # 2. SEARCH STRATEGY
+    # SEARCH STRATEGY
     # --------------------------------------------------
     for query in queries:
         try:
-            results = await wavelink.Playable.search(
+            results = await search_tracks(
                 f"ytmsearch:{query}"
             )
         except Exception as e:
             print("[AUTOPLAY SEARCH ERROR]", e)
             continue
 
-        if not results:
-            continue
+        autoplay_stats.searches += 1
+        if results:
+            pool.add(results, seed, history)
 
-        # --------------------------------------------------
-        # 3. AVOID REPEATING CURRENT TRACK
-        # --------------------------------------------------
-        filtered = [
-            track for track in results
-            if track.title.lower() != seed.title.lower()
-        ]
+        if len(pool) >= POOL_TARGET_SIZE:
+            break
 
-        candidates = filtered[:5] if filtered else results[:5]
-        pick = random.choice(candidates)
 
-        # --------------------------------------------------
-        # 4. SAFE EXTRAS HANDLING (Wavelink v2/v3)
-        # --------------------------------------------------
-        if not hasattr(pick, "extras") or not pick.extras:
-            pick.extras = {}
+# ============================================================
+# CANDIDATE POOL (AMORTIZES SEARCHES ACROSS MANY PICKS)
+# ============================================================
+POOL_LOW_WATERMARK = 3  # refill below this many candidates
+POOL_TARGET_SIZE = 8  # stop refilling once this many are ranked
 
-        pick.extras.autoplay = True
+_PENALIZED = ("cover", "karaoke", "instrumental", "8d", "sped up", "slowed", "reverb", "live")
 
-        # --------------------------------------------------
-        # 5. ROTATE SEED (CRITICAL)
-        # --------------------------------------------------
-        state.autoplay_seed = pick
 
+class CandidatePool:
+    """
+    Per-guild ranked autoplay candidates
+    - Filled from every autoplay search, deduplicated
+    - Ranked: same artist first, covers / remixes / live last
+    - Tied to the seed lineage it was built from; a seed outside
+      that lineage (queue, back) counts as drift and resets it
+    """
+
+    __slots__ = ("candidates", "seen", "lineage")
+
+    def __init__(self, seed):
+        self.candidates = []
+        self.seen = {title_key(seed.title)}
+        self.lineage = {seed_key(seed)}
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def drifted(self, seed) -> bool:
+        return seed_key(seed) not in self.lineage
+
+    def add(self, results, seed, history=()):
+        author = title_key(seed.author)
+
+        for track in results:
+            key = title_key(track.title)
+            if key in self.seen or track in history:
+                continue
+            self.seen.add(key)
+            self.candidates.append(track)
+
+        def score(track):
+            value = 0
+            if title_key(track.author) == author:
+                value += 2
+            title = title_key(track.title)
+            if any(word in title for word in _PENALIZED):
+                value -= 3
+            if track.length and not 90_000 <= track.length <= 600_000:
+                value -= 1
+            return value
+
+        # Shuffle first so equal scores still vary between sessions
+        random.shuffle(self.candidates)
+        self.candidates.sort(key=score, reverse=True)
+
+    def prune(self, history):
+        """Drop candidates played since they were ranked"""
+        self.candidates = [t for t in self.candidates if t not in history]
+
+    def draw(self, seed) -> Optional[wavelink.Playable]:
+        seed_title = title_key(seed.title)
+
+        # Pick among the top few so autoplay is not fully deterministic
+        top = [t for t in self.candidates[:3] if title_key(t.title) != seed_title]
+        if not top:
+            return None
+
+        pick = random.choice(top)
+        self.candidates.remove(pick)
+        self.lineage.add(seed_key(pick))
         return pick
 
-    return None
+
+# ============================================================
+# LOOK-AHEAD (PRECOMPUTE WHILE THE CURRENT TRACK PLAYS)
+# ============================================================
+def schedule_autoplay(state):
+    """
+    Start computing the next autoplay pick in the background
+    Only when autoplay would actually be used next
+    """
+    if not state.autoplay or state.loop or state.queue or state.is_resolving():
+        return
+
+    seed = state.autoplay_seed or state.current
+    if not seed:
+        return
+
+    key = seed_key(seed)
+    if state.autoplay_next and state.autoplay_next[0] == key:
+        return
+
+    state.invalidate_autoplay()
+    autoplay_stats.precomputed += 1
+    state.autoplay_next = (
+        key,
+        asyncio.create_task(_precompute(state, seed)),
+        time.monotonic(),
+    )
+
+
+async def _precompute(state, seed):
+    pick = await find_autoplay_track(state, seed)
+    return pick, time.monotonic()
+
+
+async def _take_precomputed(state, seed):
+    pending = state.autoplay_next
+    state.autoplay_next = None
+    if not pending:
+        return None
+
+    key, task, started = pending
+    if key != seed_key(seed):
+        task.cancel()
+        autoplay_stats.discarded += 1
+        return None
+
+    # Whatever already ran in the background is dead air saved
+    now = time.monotonic()
+    try:
+        pick, finished = await task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise
+        return None
+    except Exception as e:
+        print("[AUTOPLAY ERROR]", e)
+        return None
+
+    if pick is None:
+        return None
+
+    autoplay_stats.used += 1
+    autoplay_stats.saved_gap.observe((min(finished, now) - started) * 1000)
+    return pick
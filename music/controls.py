@@ -1,11 +1,15 @@
-import random
+import asyncio
+from typing import Optional
+
 import discord
-import wavelink
 from discord.ui import View, button
 
 from music.state import music_states
-from music.embed import build_player_embed
-from music.cooldown import cooldown_manager
+from music.cooldown import cooldown_embed, rate_limiter
+from music.embed import cached_player_embed
+from music.resolver import prefetch_queue
+
+ACK_BUDGET = 2.0  # seconds an interaction waits on the actor (Discord allows 3)
 
 
 class MusicControlView(View):
@@ -15,371 +19,320 @@ class MusicControlView(View):
     - Back / Skip / Stop safely
     - Autoplay conflict prevention
     - Cooldown & anti-spam
+
+    Persistent: one instance is registered once (bot.add_view) and
+    handles every panel; stable custom_ids, routed by interaction.guild_id,
+    so buttons keep working across restarts.
     """
 
-    def __init__(self, player: wavelink.Player, guild_id: int):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.player = player
-        self.guild_id = guild_id
-        self._sync_buttons()
 
     # ==================================================
     # COMMON HELPERS
     # ==================================================
-    async def _defer(self, interaction: discord.Interaction):
-        if not interaction.response.is_done():
-            await interaction.response.defer(ephemeral=True)
+    async def _notice(self, interaction: discord.Interaction, title: str, description: str, color):
+        """Ephemeral reply (only for clicks that change nothing)"""
+        await interaction.response.send_message(
+            embed=discord.Embed(title=title, description=description, color=color),
+            ephemeral=True,
+        )
 
-    async def _cooldown(self, interaction, key: str, seconds: float) -> bool:
-        remaining = cooldown_manager.check(interaction.user.id, key, seconds)
+    async def _cooldown(self, interaction, key: str) -> bool:
+        remaining = rate_limiter.check(interaction.user.id, interaction.guild_id, key)
         if remaining is not None:
-            await self._defer(interaction)
-            await interaction.followup.send(
-                embed=discord.Embed(
-                    title="⏳ Cooldown Active",
-                    description=f"Please wait **{remaining:.1f}s** before using this control again.",
-                    color=discord.Color.orange(),
-                ),
-                ephemeral=True,
-            )
+            await interaction.response.send_message(embed=cooldown_embed(remaining), ephemeral=True)
             return True
         return False
 
-    async def _check_user(self, interaction: discord.Interaction) -> bool:
-        if not interaction.user.voice or not self.player or not self.player.channel:
-            await self._defer(interaction)
-            await interaction.followup.send(
-                embed=discord.Embed(
-                    title="Access Denied",
-                    description="You must be connected to a voice channel.",
-                    color=discord.Color.red(),
-                ),
-                ephemeral=True,
+    def _player(self, interaction: discord.Interaction):
+        state = music_states.get(interaction.guild_id)
+        if state and state.player:
+            return state.player
+        return interaction.guild.voice_client if interaction.guild else None
+
+    async def _check_user(self, interaction: discord.Interaction, player) -> bool:
+        if not interaction.user.voice or not player or not player.channel:
+            await self._notice(
+                interaction,
+                "Access Denied",
+                "You must be connected to a voice channel.",
+                discord.Color.red(),
             )
             return False
 
-        if interaction.user.voice.channel != self.player.channel:
-            await self._defer(interaction)
-            await interaction.followup.send(
-                embed=discord.Embed(
-                    title="Access Denied",
-                    description="You must be in the **same voice channel** as the bot.",
-                    color=discord.Color.red(),
-                ),
-                ephemeral=True,
+        if interaction.user.voice.channel != player.channel:
+            await self._notice(
+                interaction,
+                "Access Denied",
+                "You must be in the **same voice channel** as the bot.",
+                discord.Color.red(),
             )
             return False
 
         return True
 
-    def _sync_buttons(self):
-        state = music_states.get(self.guild_id)
+    def _sync_buttons(self, guild_id: int):
+        state = music_states.get(guild_id)
+        player = state.player if state else None
 
-        has_player = bool(self.player and self.player.channel)
+        has_player = bool(player and player.channel)
         has_queue = bool(state and state.queue)
         has_previous = bool(state and state.previous)
 
         for item in self.children:
-            if item.label in ("🔉 Down", "🔊 Up"):
-                item.disabled = not has_player
-            elif item.label == "⏮ Back":
+            if item.custom_id == "music:back":
                 item.disabled = not has_previous
-            elif item.label in ("⏸ Pause", "▶ Resume", "⏭ Skip", "🔁 Loop", "🔄 Autoplay", "⏹ Stop"):
+            elif item.custom_id == "music:pause":
+                # Rendered from the player so every refresh stays correct
+                item.label = "▶ Resume" if has_player and player.paused else "⏸ Pause"
                 item.disabled = not has_player
-            elif item.label == "🔀 Shuffle":
+            elif item.custom_id == "music:shuffle":
                 item.disabled = not has_queue
+            else:
+                item.disabled = not has_player
 
-    async def _update_panel(self):
-        state = music_states.get(self.guild_id)
-        if state and state.message:
-            try:
-                await state.message.edit(
-                    embed=build_player_embed(state),
-                    view=self,
-                )
-            except Exception:
-                pass
+    def _actor(self, interaction: discord.Interaction):
+        state = music_states.get(interaction.guild_id)
+        return state.actor if state else None
+
+    def _player_changed(self, interaction: discord.Interaction, mode: str, value):
+        state = music_states.get(interaction.guild_id)
+        if state:
+            state.toggled(mode, value)
+
+    async def _render(self, interaction: discord.Interaction):
+        """
+        Acknowledge the click by redrawing the panel it came from
+        - One REST call (interaction response of type message update)
+        - The guild's PanelUpdater is told what is now shown, so its own
+          queued refresh for the same change is skipped as unchanged
+        """
+        state = music_states.get(interaction.guild_id)
+        if state is None:
+            # Session ended meanwhile (its final panel is already drawn)
+            return await interaction.response.defer()
+
+        embed = cached_player_embed(state)
+        view = panel_view(interaction.guild_id)
+
+        message = interaction.message
+        if state.panel and state.message and message and message.id == state.message.id:
+            state.panel.rendered(embed, view)
+
+        await interaction.response.edit_message(embed=embed, view=view)
 
     # ==================================================
     # VOLUME DOWN
     # ==================================================
-    @button(label="🔉 Down", style=discord.ButtonStyle.secondary)
+    @button(label="🔉 Down", style=discord.ButtonStyle.secondary, custom_id="music:volume_down")
     async def volume_down(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "volume", 1.5):
+        if await self._cooldown(interaction, "volume"):
             return
 
-        await self._defer(interaction)
-
-        new_volume = max(1, getattr(self.player, "volume", 100) - 10)
-        await self.player.set_volume(new_volume)
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="🔉 Volume Changed",
-                description=f"Volume set to **{new_volume}%**",
-                color=discord.Color.blurple(),
-            ),
-            ephemeral=True,
-        )
+        await player.set_volume(max(1, getattr(player, "volume", 100) - 10))
+        self._player_changed(interaction, "volume", player.volume)
+        await self._render(interaction)
 
     # ==================================================
     # VOLUME UP
     # ==================================================
-    @button(label="🔊 Up", style=discord.ButtonStyle.secondary)
+    @button(label="🔊 Up", style=discord.ButtonStyle.secondary, custom_id="music:volume_up")
     async def volume_up(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "volume", 1.5):
+        if await self._cooldown(interaction, "volume"):
             return
 
-        await self._defer(interaction)
-
-        new_volume = min(200, getattr(self.player, "volume", 100) + 10)
-        await self.player.set_volume(new_volume)
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="🔊 Volume Changed",
-                description=f"Volume set to **{new_volume}%**",
-                color=discord.Color.blurple(),
-            ),
-            ephemeral=True,
-        )
+        await player.set_volume(min(200, getattr(player, "volume", 100) + 10))
+        self._player_changed(interaction, "volume", player.volume)
+        await self._render(interaction)
 
     # ==================================================
     # BACK
     # ==================================================
-    @button(label="⏮ Back", style=discord.ButtonStyle.secondary)
+    @button(label="⏮ Back", style=discord.ButtonStyle.secondary, custom_id="music:back")
     async def back(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "back", 3):
+        if await self._cooldown(interaction, "back"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
-        if not state or not state.previous:
-            return await interaction.followup.send(
-                embed=discord.Embed(
-                    title="⏮ No Previous Track",
-                    description="There is no previously played track.",
-                    color=discord.Color.orange(),
-                ),
-                ephemeral=True,
-            )
-
-        # 🔒 ONE-TIME BACK (ANTI-LOOP)
-        state.manual_action = "back"
-
-        back_track = state.previous
-
-        # ❗ CRITICAL FIX
-        state.previous = None  # 🚫 prevents loop
-        state.current = back_track
-        state.autoplay_seed = back_track
-
-        await self.player.play(back_track, replace=True)
-        await self._update_panel()
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="⏮ Playing Previous Track",
-                description=f"Now playing **{back_track.title}**",
-                color=discord.Color.green(),
-            ),
-            ephemeral=True,
-        )
+        # No previous track: the redrawn panel shows Back disabled
+        actor = self._actor(interaction)
+        if actor:
+            await settle(actor.post("back"))
+        await self._render(interaction)
 
     # ==================================================
     # PAUSE / RESUME
     # ==================================================
-    @button(label="⏸ Pause", style=discord.ButtonStyle.primary)
-    async def pause_resume(self, interaction: discord.Interaction, button):
-        if not await self._check_user(interaction):
+    @button(label="⏸ Pause", style=discord.ButtonStyle.primary, custom_id="music:pause")
+    async def pause_resume(self, interaction: discord.Interaction, _):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "pause", 2):
+        if await self._cooldown(interaction, "pause"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
-        if state:
-            state.manual_action = True
-
-        if self.player.paused:
-            await self.player.pause(False)
-            button.label = "⏸ Pause"
-            msg = "▶ Playback resumed."
-        else:
-            await self.player.pause(True)
-            button.label = "▶ Resume"
-            msg = "⏸ Playback paused."
-
-        await interaction.message.edit(view=self)
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="Playback Control",
-                description=msg,
-                color=discord.Color.blurple(),
-            ),
-            ephemeral=True,
-        )
+        await player.pause(not player.paused)
+        self._player_changed(interaction, "paused", player.paused)
+        await self._render(interaction)
 
     # ==================================================
     # SKIP
     # ==================================================
-    @button(label="⏭ Skip", style=discord.ButtonStyle.secondary)
+    @button(label="⏭ Skip", style=discord.ButtonStyle.secondary, custom_id="music:skip")
     async def skip(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "skip", 3):
+        if await self._cooldown(interaction, "skip"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
-
-        # 🔓 SKIP = NOT manual (autoplay allowed)
-        if state:
-            state.manual_action = False
-
-        await self.player.stop()
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="⏭ Track Skipped",
-                description="Skipping to the next track.",
-                color=discord.Color.blurple(),
-            ),
-            ephemeral=True,
-        )
+        # Actor moves to the next track (queue → autoplay → end)
+        state = music_states.get(interaction.guild_id)
+        if state and state.actor:
+            await settle(state.actor.post("skip", state.current))
+        await self._render(interaction)
 
     # ==================================================
     # SHUFFLE
     # ==================================================
-    @button(label="🔀 Shuffle", style=discord.ButtonStyle.secondary)
+    @button(label="🔀 Shuffle", style=discord.ButtonStyle.secondary, custom_id="music:shuffle")
     async def shuffle(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "shuffle", 3):
+        if await self._cooldown(interaction, "shuffle"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
-        if not state or not state.queue:
-            return await interaction.followup.send(
-                embed=discord.Embed(
-                    title="Queue Empty",
-                    description="There are no tracks to shuffle.",
-                    color=discord.Color.red(),
-                ),
-                ephemeral=True,
-            )
-
-        random.shuffle(state.queue)
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="🔀 Queue Shuffled",
-                description="The queue order has been randomized.",
-                color=discord.Color.green(),
-            ),
-            ephemeral=True,
-        )
+        state = music_states.get(interaction.guild_id)
+        if state and state.queue:
+            state.queue.shuffle()
+            prefetch_queue(state.queue)
+        await self._render(interaction)
 
     # ==================================================
     # LOOP
     # ==================================================
-    @button(label="🔁 Loop", style=discord.ButtonStyle.secondary)
+    @button(label="🔁 Loop", style=discord.ButtonStyle.secondary, custom_id="music:loop")
     async def loop(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "loop", 3):
+        if await self._cooldown(interaction, "loop"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
-        state.loop = not state.loop
-
-        await self._update_panel()
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="🔁 Loop Mode",
-                description=f"Loop is now **{'ENABLED' if state.loop else 'DISABLED'}**",
-                color=discord.Color.green() if state.loop else discord.Color.red(),
-            ),
-            ephemeral=True,
-        )
+        # New mode shows in the panel footer
+        actor = self._actor(interaction)
+        if actor:
+            await settle(actor.post("loop"))
+        await self._render(interaction)
 
     # ==================================================
     # AUTOPLAY
     # ==================================================
-    @button(label="🔄 Autoplay", style=discord.ButtonStyle.secondary)
+    @button(label="🔄 Autoplay", style=discord.ButtonStyle.secondary, custom_id="music:autoplay")
     async def autoplay(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "autoplay", 3):
+        if await self._cooldown(interaction, "autoplay"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
-        state.autoplay = not state.autoplay
-
-        if state.autoplay and not state.autoplay_seed and state.current:
-            state.autoplay_seed = state.current
-
-        await self._update_panel()
-
-        await interaction.followup.send(
-            embed=discord.Embed(
-                title="🔄 Autoplay",
-                description=f"Autoplay is now **{'ENABLED' if state.autoplay else 'DISABLED'}**",
-                color=discord.Color.green() if state.autoplay else discord.Color.red(),
-            ),
-            ephemeral=True,
-        )
+        actor = self._actor(interaction)
+        if actor:
+            await settle(actor.post("autoplay"))
+        await self._render(interaction)
 
     # ==================================================
     # STOP
     # ==================================================
-    @button(label="⏹ Stop", style=discord.ButtonStyle.danger)
+    @button(label="⏹ Stop", style=discord.ButtonStyle.danger, custom_id="music:stop")
     async def stop(self, interaction: discord.Interaction, _):
-        if not await self._check_user(interaction):
+        player = self._player(interaction)
+        if not await self._check_user(interaction, player):
             return
-        if await self._cooldown(interaction, "stop", 5):
+        if await self._cooldown(interaction, "stop"):
             return
 
-        await self._defer(interaction)
-
-        state = music_states.get(self.guild_id)
+        # Stop must not queue up behind a wait on a resolving playlist
+        state = music_states.get(interaction.guild_id)
         if state:
-            state.manual_action = True
-
-        try:
-            await self.player.disconnect(force=True)
-        except Exception:
-            pass
+            state.cancel_resolve()
 
-        music_states.pop(self.guild_id, None)
-
-        try:
-            await interaction.message.edit(view=None)
-        except Exception:
-            pass
+        if state and state.actor:
+            await settle(state.actor.post("stop"))
+        else:
+            try:
+                await player.disconnect(force=True)
+            except Exception:
+                pass
 
-        await interaction.followup.send(
+        # Panel becomes the stop notice (buttons removed) in the same call
+        await interaction.response.edit_message(
             embed=discord.Embed(
                 title="⏹ Music Stopped",
                 description="Playback stopped and the bot has left the voice channel.",
                 color=discord.Color.red(),
             ),
-            ephemeral=True,
+            view=None,
         )
+
+
+async def settle(future: Optional[asyncio.Future]):
+    """
+    Wait for an actor result within an interaction's ack budget
+    - None if the message was dropped or is still waiting its turn
+    - Slower transitions still complete; the PanelUpdater redraws after
+    """
+    if future is None:
+        return None
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), ACK_BUDGET)
+    except asyncio.TimeoutError:
+        return None
+
+
+class PanelView(MusicControlView):
+    """
+    Button layout for panel messages (render only)
+    - Reports itself finished so discord.py never stores it per message;
+      clicks are handled by the registered MusicControlView
+    """
+
+    def is_finished(self) -> bool:
+        return True
+
+
+# ============================================================
+# GLOBAL INSTANCES (created on the bot's event loop)
+# ============================================================
+_controls: Optional[MusicControlView] = None
+_renderer: Optional[PanelView] = None
+
+
+def register_controls(client: discord.Client):
+    """Register the persistent control view once per process"""
+    global _controls
+    if _controls is None:
+        _controls = MusicControlView()
+        client.add_view(_controls)
+
+
+def panel_view(guild_id: int) -> View:
+    """
+    The panel buttons as they should look for a guild
+    - One shared renderer: serialize it (send / edit) before awaiting
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = PanelView()
+    _renderer._sync_buttons(guild_id)
+    return _renderer
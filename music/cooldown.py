@@ -1,30 +1,183 @@
 import time
-from collections import defaultdict
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
 
+import discord
+from core.config import (
+    RATE_GLOBAL_CAPACITY,
+    RATE_GLOBAL_REFILL,
+    RATE_GUILD_CAPACITY,
+    RATE_GUILD_REFILL,
+    RATE_MAX_BUCKETS,
+)
 
-class ButtonCooldown:
+# Per-user limits: action → (burst, seconds per token)
+USER_LIMITS = {
+    # Panel buttons (same spacing as the old per-button cooldowns)
+    "volume": (1, 1.5),
+    "pause": (1, 2),
+    "back": (1, 3),
+    "skip": (1, 3),
+    "shuffle": (1, 3),
+    "loop": (1, 3),
+    "autoplay": (1, 3),
+    "stop": (1, 5),
+    # Slash commands (/skip, /loop, ... share the button buckets)
+    "resume": (1, 2),
+    "leave": (1, 5),
+    "play": (3, 5),
+    "lyrics": (2, 5),
+}
+DEFAULT_USER_LIMIT = (3, 2)  # any other slash command
+
+# (capacity, tokens / second) per action
+_USER_RATES = {action: (burst, 1 / seconds) for action, (burst, seconds) in USER_LIMITS.items()}
+_DEFAULT_RATE = (DEFAULT_USER_LIMIT[0], 1 / DEFAULT_USER_LIMIT[1])
+
+EXPIRE_PER_CHECK = 8  # idle buckets dropped per check (amortized sweep)
+
+
+def _user_key_limit(key) -> Tuple[float, float]:
+    return _USER_RATES.get(key[1], _DEFAULT_RATE)
+
+
+class TokenBucket:
+    """Lazily refilled token bucket (tokens as of `updated`)"""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+    def level(self, capacity: float, rate: float, now: float) -> float:
+        return min(capacity, self.tokens + (now - self.updated) * rate)
+
+
+class BucketTable:
     """
-    Per-user per-button cooldown system
-    Prevents button spam safely
+    One scope's buckets, bounded
+    - LRU order: least recently used first
+    - Idle buckets (refilled to full) equal a fresh bucket, so dropping
+      them loses nothing; a few are swept from the front on every check
+    - Hard cap `maxsize`: the least recently used bucket is evicted
     """
 
-    def __init__(self):
-        self._cooldowns = defaultdict(dict)
+    __slots__ = ("maxsize", "_buckets")
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict = OrderedDict()
+
+    def get(self, key, capacity: float, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def expire(self, now: float, limit: Callable[[object], Tuple[float, float]]):
+        """Drop idle buckets from the LRU front; limit(key) → (capacity, rate)"""
+        buckets = self._buckets
+        for _ in range(EXPIRE_PER_CHECK):
+            if not buckets:
+                return
+            key, bucket = next(iter(buckets.items()))
+            capacity, rate = limit(key)
+            if bucket.level(capacity, rate, now) < capacity:
+                return
+            del buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
 
-    def check(self, user_id: int, action: str, cooldown: float):
+
+class RateLimiter:
+    """
+    Shared rate limiter for panel buttons and slash commands
+    - Per-user (per action), per-guild and global token buckets
+    - A request must pass all three; tokens are only taken if it does
+    - Lazy refill: no timers, buckets are updated when touched
+    - Bounded memory: idle buckets are swept, tables are capped
+    """
+
+    def __init__(
+        self,
+        max_buckets: int = RATE_MAX_BUCKETS,
+        guild_limit: Tuple[float, float] = (RATE_GUILD_CAPACITY, RATE_GUILD_REFILL),
+        global_limit: Tuple[float, float] = (RATE_GLOBAL_CAPACITY, RATE_GLOBAL_REFILL),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clock = clock
+        self.guild_limit = guild_limit
+        self.global_limit = global_limit
+        self._users = BucketTable(max_buckets)
+        self._guilds = BucketTable(max_buckets)
+        self._global = TokenBucket(global_limit[0], clock())
+
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, user_id: int, guild_id: Optional[int], action: str) -> Optional[float]:
         """
-        Returns remaining cooldown time if blocked
-        Returns None if allowed
+        Returns seconds to wait if blocked
+        Returns None if allowed (and takes one token per scope)
         """
-        now = time.monotonic()
-        last_used = self._cooldowns[user_id].get(action)
+        now = self.clock()
+
+        user_limit = _USER_RATES.get(action, _DEFAULT_RATE)
+        user = self._users.get((user_id, action), user_limit[0], now)
+        guild = self._guilds.get(guild_id, self.guild_limit[0], now)
+
+        scopes = (
+            (user, *user_limit),
+            (guild, *self.guild_limit),
+            (self._global, *self.global_limit),
+        )
+
+        wait = 0.0
+        for bucket, capacity, rate in scopes:
+            bucket.tokens = bucket.level(capacity, rate, now)
+            bucket.updated = now
+            if bucket.tokens < 1 - 1e-9:  # float refill at exactly the boundary
+                wait = max(wait, (1 - bucket.tokens) / rate)
+
+        if wait:
+            self.limited += 1
+        else:
+            for bucket, _, _ in scopes:
+                bucket.tokens -= 1
+            self.allowed += 1
+
+        # After the take: the buckets just used are never idle here
+        self._users.expire(now, _user_key_limit)
+        self._guilds.expire(now, self._guild_key_limit)
+
+        return (round(wait, 1) or 0.1) if wait else None
+
+    def _guild_key_limit(self, _) -> Tuple[float, float]:
+        return self.guild_limit
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "user_buckets": len(self._users),
+            "guild_buckets": len(self._guilds),
+        }
 
-        if last_used and (now - last_used) < cooldown:
-            return round(cooldown - (now - last_used), 1)
 
-        self._cooldowns[user_id][action] = now
-        return None
+def cooldown_embed(remaining: float) -> discord.Embed:
+    return discord.Embed(
+        title="⏳ Cooldown Active",
+        description=f"Please wait **{remaining:.1f}s** before using this control again.",
+        color=discord.Color.orange(),
+    )
 
 
 # GLOBAL INSTANCE
-cooldown_manager = ButtonCooldown()
+rate_limiter = RateLimiter()
@@ -1,4 +1,5 @@
 import discord
+from core.config import PROGRESS_BAR_WIDTH, PROGRESS_MAX_INTERVAL, PROGRESS_MIN_INTERVAL
 from music.state import MusicState
 
 SYSTEM_ICON = (
@@ -8,6 +9,34 @@ SYSTEM_ICON = (
 SYSTEM_ICON = "https://media.discordapp.net/attachments/1420115492580098272/1452709148344062106/Mikey.png?ex=694acc52&is=69497ad2&hm=22b482987bea03204bab414b2eb2e489d644d4bc9585c9702d879b5b6d47ff24&=&format=webp&quality=lossless"
 
 
+def _clock(ms: int) -> str:
+    minutes = ms // 60000
+    seconds = (ms // 1000) % 60
+    return f"{minutes}:{seconds:02d}"
+
+
+def progress_interval(length_ms: int) -> float:
+    """Seconds between refreshes: one bar cell, within the configured bounds"""
+    cell = (length_ms or 0) / 1000 / PROGRESS_BAR_WIDTH
+    return min(PROGRESS_MAX_INTERVAL, max(PROGRESS_MIN_INTERVAL, cell))
+
+
+def shown_position(player, track) -> int:
+    """
+    Playback position the panel shows (ms)
+    - Rounded down to the progress interval, so renders inside one
+      interval are identical (and skipped as unchanged)
+    """
+    step = int(progress_interval(track.length) * 1000)
+    position = min(max(player.position, 0), track.length)
+    return position - position % step
+
+
+def _progress_bar(position: int, length: int) -> str:
+    filled = min(PROGRESS_BAR_WIDTH - 1, position * PROGRESS_BAR_WIDTH // length)
+    return "▬" * filled + "🔘" + "▬" * (PROGRESS_BAR_WIDTH - filled - 1)
+
+
 def build_player_embed(state: MusicState) -> discord.Embed:
     """
     Unified production-grade music control embed
@@ -61,11 +90,14 @@ def build_player_embed(state: MusicState) -> discord.Embed:
             inline=True,
         )
 
-        # Duration (safe for live streams)
+        # Duration (safe for live streams); position while playing
+        player = state.player if state else None
+        position = None
         if getattr(track, "length", 0):
-            minutes = track.length // 60000
-            seconds = (track.length // 1000) % 60
-            duration = f"{minutes}:{seconds:02d}"
+            duration = _clock(track.length)
+            if player and not getattr(track, "is_stream", False):
+                position = shown_position(player, track)
+                duration = f"{_clock(position)} / {duration}"
         else:
             duration = "Live"
 
@@ -81,6 +113,14 @@ def build_player_embed(state: MusicState) -> discord.Embed:
             inline=True,
         )
 
+        # Progress bar (refreshed by music.progress)
+        if position is not None:
+            embed.add_field(
+                name="⏱ Progress",
+                value=_progress_bar(position, track.length),
+                inline=False,
+            )
+
         # Thumbnail (safe)
         if getattr(track, "artwork", None):
             embed.set_thumbnail(url=track.artwork)
@@ -92,19 +132,85 @@ def build_player_embed(state: MusicState) -> discord.Embed:
             inline=False,
         )
 
+    # ============================================================
+    # PLAYLIST RESOLUTION PROGRESS
+    # ============================================================
+    if state and state.resolve_progress:
+        resolved, total = state.resolve_progress
+        embed.add_field(
+            name="📥 Loading Playlist",
+            value=f"Resolved **{resolved}/{total}** tracks…",
+            inline=False,
+        )
+
     # ============================================================
     # FOOTER (SAFE)
     # ============================================================
     queue_size = len(state.queue) if state and state.queue else 0
+    player = state.player if state else None
+    volume = f" • Volume: {player.volume}%" if player else ""
 
     embed.set_footer(
         text=(
             f"Autoplay: {'ON' if state.autoplay else 'OFF'} • "
             f"Loop: {'ON' if state.loop else 'OFF'} • "
-            f"Queue: {queue_size}\n"
+            f"Queue: {queue_size}{volume}\n"
             "© 2025 Mac GunJon • Music System"
         ),
         icon_url=requester_avatar,
     )
 
     return embed
+
+
+# ============================================================
+# RENDER CACHE (PER GUILD STATE VERSION)
+# ============================================================
+class RenderStats:
+    """Panel embed cache hits / misses (all guilds)"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# GLOBAL INSTANCE
+render_stats = RenderStats()
+
+
+def render_key(state: MusicState) -> tuple:
+    """
+    Everything the panel reads: state version + live player fields
+    - Position only counts per progress interval (what the panel shows)
+    """
+    player = state.player
+    if player is None:
+        return (state.version,)
+
+    track = state.current
+    position = None
+    if track and getattr(track, "length", 0) and not getattr(track, "is_stream", False):
+        position = shown_position(player, track)
+
+    return (state.version, bool(player.channel), player.paused, player.volume, position)
+
+
+def cached_player_embed(state: MusicState) -> discord.Embed:
+    """
+    build_player_embed, reused while the render key is unchanged
+    - One entry per guild (kept on the state itself)
+    - Callers must not mutate the returned embed
+    """
+    key = render_key(state)
+    cached = state.rendered
+    if cached is not None and cached[0] == key:
+        render_stats.hits += 1
+        return cached[1]
+
+    render_stats.misses += 1
+    embed = build_player_embed(state)
+    state.rendered = (key, embed)
+    return embed
@@ -0,0 +1,101 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Type
+
+
+# ============================================================
+# STATE CHANGE EVENTS
+# ============================================================
+class StateEvent:
+    """Base event: a guild's MusicState moved to `version`"""
+
+    __slots__ = ("guild_id", "version")
+
+    def __init__(self, guild_id: int, version: int):
+        self.guild_id = guild_id
+        self.version = version
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} guild={self.guild_id} v{self.version}>"
+
+
+class TrackChanged(StateEvent):
+    """Current track replaced (next / back / loop restart / stop)"""
+
+    __slots__ = ("track",)
+
+    def __init__(self, guild_id: int, version: int, track):
+        super().__init__(guild_id, version)
+        self.track = track
+
+
+class QueueMutated(StateEvent):
+    """Queue entries added / removed / reordered (or playlist progress)"""
+
+    __slots__ = ("size",)
+
+    def __init__(self, guild_id: int, version: int, size: int):
+        super().__init__(guild_id, version)
+        self.size = size
+
+
+class ModeToggled(StateEvent):
+    """Loop / autoplay / pause / volume changed"""
+
+    __slots__ = ("mode", "value")
+
+    def __init__(self, guild_id: int, version: int, mode: str, value):
+        super().__init__(guild_id, version)
+        self.mode = mode
+        self.value = value
+
+
+class SessionReset(StateEvent):
+    """Session stopped; state was cleared"""
+
+    __slots__ = ()
+
+
+# ============================================================
+# EVENT BUS
+# ============================================================
+class EventBus:
+    """
+    Synchronous publish / subscribe for state events
+    - Handlers subscribe to an event type (StateEvent = everything)
+    - Handlers must be cheap (mark dirty, count); slow work is
+      scheduled by the subscriber itself
+    - A failing handler never affects the publisher or other handlers
+    """
+
+    def __init__(self):
+        self._handlers: Dict[Type[StateEvent], List[Callable]] = defaultdict(list)
+
+    def subscribe(self, event_type: Type[StateEvent], handler: Callable[[StateEvent], None]):
+        self._handlers[event_type].append(handler)
+
+    def publish(self, event: StateEvent):
+        for event_type in type(event).__mro__:
+            for handler in self._handlers.get(event_type, ()):
+                try:
+                    handler(event)
+                except Exception as e:
+                    print("[EVENT ERROR]", type(event).__name__, e)
+
+
+class EventMetrics:
+    """State event counts by type (all guilds)"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def observe(self, event: StateEvent):
+        self.counts[type(event).__name__] += 1
+
+    def stats(self) -> dict:
+        return dict(self.counts)
+
+
+# GLOBAL INSTANCES
+state_events = EventBus()
+event_metrics = EventMetrics()
+state_events.subscribe(StateEvent, event_metrics.observe)
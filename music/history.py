@@ -0,0 +1,58 @@
+from typing import Optional
+
+
+def title_key(title: str) -> str:
+    """Case / whitespace insensitive title used for duplicate checks"""
+    return " ".join((title or "").casefold().split())
+
+
+def track_keys(track) -> tuple:
+    """Identity keys of a track: source identifier + normalized title"""
+    identifier = getattr(track, "identifier", None)
+    title = title_key(getattr(track, "title", None))
+    return tuple(key for key in (identifier, title and f"title:{title}") if key)
+
+
+class RecentHistory:
+    """
+    Fixed-size memory of recently played tracks (per guild)
+    - Ring buffer of the last `size` tracks' keys
+    - Hashed key → count map for O(1) membership checks
+    - Memory is bounded by `size` no matter how long the session runs
+    """
+
+    __slots__ = ("size", "_ring", "_head", "_counts")
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._ring: list[Optional[tuple]] = [None] * self.size
+        self._head = 0
+        self._counts: dict[str, int] = {}
+
+    def add(self, track):
+        # Evict the oldest slot before overwriting it
+        for key in self._ring[self._head] or ():
+            count = self._counts[key] - 1
+            if count:
+                self._counts[key] = count
+            else:
+                del self._counts[key]
+
+        keys = track_keys(track)
+        self._ring[self._head] = keys
+        self._head = (self._head + 1) % self.size
+
+        for key in keys:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def __contains__(self, track) -> bool:
+        """True if the track (by id or title) was played within the window"""
+        return any(key in self._counts for key in track_keys(track))
+
+    def __len__(self) -> int:
+        return sum(1 for keys in self._ring if keys is not None)
+
+    def clear(self):
+        self._ring = [None] * self.size
+        self._head = 0
+        self._counts.clear()
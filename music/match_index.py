@@ -0,0 +1,84 @@
+import asyncio
+import json
+from typing import Optional
+
+from core.config import MATCH_INDEX_MEMORY_SIZE, MATCH_INDEX_PATH
+from core.store import LRUCache, SQLiteStore
+
+
+class MatchIndex:
+    """
+    Persistent Spotify → Lavalink match index
+    - Keyed by Spotify track ID and by ISRC
+    - Value: raw payload of the Lavalink track chosen for it
+    - Filled as a side effect of normal resolution
+    """
+
+    def __init__(self, path: str, memory_size: int):
+        self._memory = LRUCache(memory_size)
+        self._disk = SQLiteStore(path, "spotify_matches")
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _keys(spotify_id: Optional[str], isrc: Optional[str]):
+        keys = []
+        if spotify_id:
+            keys.append(f"spotify:{spotify_id}")
+        if isrc:
+            keys.append(f"isrc:{isrc.upper()}")
+        return keys
+
+    async def get(self, spotify_id: Optional[str], isrc: Optional[str]) -> Optional[dict]:
+        """Return the indexed raw track payload, or None"""
+        keys = self._keys(spotify_id, isrc)
+
+        for key in keys:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self.hits += 1
+                return payload
+
+        for key in keys:
+            try:
+                value = await asyncio.to_thread(self._disk.get, key)
+            except Exception as e:
+                print("[MATCH INDEX ERROR]", e)
+                value = None
+
+            if value is not None:
+                payload = json.loads(value)
+                for k in keys:
+                    self._memory.set(k, payload)
+                self.hits += 1
+                return payload
+
+        self.misses += 1
+        return None
+
+    async def put(self, spotify_id: Optional[str], isrc: Optional[str], payload: dict):
+        keys = self._keys(spotify_id, isrc)
+        if not keys:
+            return
+
+        value = json.dumps(payload).encode()
+        for key in keys:
+            self._memory.set(key, payload)
+
+        try:
+            for key in keys:
+                await asyncio.to_thread(self._disk.set, key, value)
+        except Exception as e:
+            print("[MATCH INDEX ERROR]", e)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+
+# GLOBAL INSTANCE
+match_index = MatchIndex(MATCH_INDEX_PATH, memory_size=MATCH_INDEX_MEMORY_SIZE)
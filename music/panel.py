@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+from typing import Optional
+
+import discord
+from core.config import PANEL_DEBOUNCE, PANEL_MIN_INTERVAL
+from music.controls import panel_view
+from music.embed import cached_player_embed
+from music.events import SessionReset, StateEvent, state_events
+from music.state import music_states
+
+
+class PanelStats:
+    """Control panel edit metrics (all guilds)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.edits = 0
+        self.unchanged = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "edits": self.edits,
+            "coalesced": self.requests - self.edits - self.unchanged,
+            "unchanged": self.unchanged,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+        }
+
+
+# GLOBAL INSTANCE
+panel_stats = PanelStats()
+
+
+def render_hash(embed: discord.Embed, view: discord.ui.View) -> int:
+    """Identity of what the panel would show"""
+    buttons = [
+        (item.label, item.disabled, int(item.style))
+        for item in view.children
+        if isinstance(item, discord.ui.Button)
+    ]
+    return hash(json.dumps([embed.to_dict(), buttons], sort_keys=True, default=str))
+
+
+class PanelUpdater:
+    """
+    Per-guild control panel writer
+    - request() marks the panel dirty; edits are debounced and merged
+    - Renders once per edit and skips it if nothing visible changed
+    - Keeps edits PANEL_MIN_INTERVAL apart (message edit bucket)
+    - 429: waits retry_after and retries; other failures are retried
+      on the next request instead of being silently lost
+    """
+
+    __slots__ = ("state", "guild_id", "_dirty", "_task", "_last_embed", "_last_hash", "_last_edit")
+
+    def __init__(self, state, guild_id: int):
+        self.state = state
+        self.guild_id = guild_id
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._last_embed: Optional[discord.Embed] = None  # cached render last shown
+        self._last_hash: Optional[int] = None
+        self._last_edit = 0.0
+
+    def request(self):
+        panel_stats.requests += 1
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self):
+        """Drop pending edits (panel is being replaced / removed)"""
+        self._dirty = False
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def forget(self):
+        """New panel message: next edit must not be skipped"""
+        self._last_embed = None
+        self._last_hash = None
+
+    def rendered(self, embed: discord.Embed, view: discord.ui.View):
+        """The panel was redrawn elsewhere (button click response)"""
+        self._last_embed = embed
+        self._last_hash = render_hash(embed, view)
+        self._last_edit = time.monotonic()
+
+    async def _run(self):
+        while self._dirty:
+            # Debounce, then respect the per-message edit spacing
+            delay = max(PANEL_DEBOUNCE, self._last_edit + PANEL_MIN_INTERVAL - time.monotonic())
+            await asyncio.sleep(delay)
+
+            self._dirty = False
+            await self._edit()
+
+    async def _edit(self):
+        state = self.state
+        message = state.message
+        player = state.player
+        if not message or not player:
+            return
+
+        # Same cached render as last time: nothing to hash or send
+        embed = cached_player_embed(state)
+        if embed is self._last_embed:
+            panel_stats.unchanged += 1
+            return
+
+        digest = render_hash(embed, panel_view(self.guild_id))
+        if digest == self._last_hash:
+            panel_stats.unchanged += 1
+            self._last_embed = embed
+            return
+
+        while True:
+            try:
+                # Shared renderer: re-sync for this guild right before sending
+                await message.edit(embed=embed, view=panel_view(self.guild_id))
+            except discord.RateLimited as e:
+                panel_stats.rate_limited += 1
+                await asyncio.sleep(e.retry_after)
+                continue
+            except discord.NotFound:
+                # Panel deleted by someone: stop editing it
+                if state.message is message:
+                    state.message = None
+                return
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    panel_stats.rate_limited += 1
+                    await asyncio.sleep(_retry_after(e))
+                    continue
+
+                panel_stats.failures += 1
+                print("[PANEL ERROR]", e)
+                return
+            except Exception as e:
+                panel_stats.failures += 1
+                print("[PANEL ERROR]", e)
+                return
+
+            break
+
+        panel_stats.edits += 1
+        self._last_embed = embed
+        self._last_hash = digest
+        self._last_edit = time.monotonic()
+
+
+def _retry_after(error: discord.HTTPException) -> float:
+    headers = getattr(error.response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", PANEL_MIN_INTERVAL))
+    except (TypeError, ValueError):
+        return PANEL_MIN_INTERVAL
+
+
+def refresh_panel(state, guild_id: int):
+    """Schedule a (coalesced) control panel refresh for the guild"""
+    if state.panel is None:
+        state.panel = PanelUpdater(state, guild_id)
+    state.panel.request()
+
+
+# ============================================================
+# STATE EVENT SUBSCRIBER
+# ============================================================
+def _on_state_event(event: StateEvent):
+    if isinstance(event, SessionReset):
+        return
+
+    state = music_states.get(event.guild_id)
+    if state is None or not state.message:
+        return
+    # Stopping session: its final panel is drawn by the actor
+    if state.actor and state.actor.closed:
+        return
+
+    refresh_panel(state, event.guild_id)
+
+
+state_events.subscribe(StateEvent, _on_state_event)
@@ -1,105 +1,403 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import discord
 import wavelink
-from music.autoplay import get_autoplay_track
+from core.config import LYRICS_PREFETCH, MAX_QUEUE_LENGTH
+from core.metrics import Histogram
+from music.autoplay import get_autoplay_track, schedule_autoplay
+from music.recommender import recommender
+from music.resolver import materialize, prefetch_queue
 from music.state import music_states
-from music.embed import build_player_embed
-from music.controls import MusicControlView
+from music.transitions import transition_monitor
+from music.progress import progress_scheduler
+from services.genius import lyrics_cache
+
+RESOLVE_WAIT_TIMEOUT = 15  # seconds to wait for the next resolved track
+MAILBOX_SIZE = 32  # pending user messages per guild before dropping
+LIFECYCLE = frozenset({"start", "end", "stop"})  # never dropped
+TEARDOWN_WAIT = 5  # seconds /play waits for a stopping session to disconnect
+
+# Guild id → teardown of a stopping session (set once it has finished)
+_teardowns: Dict[int, asyncio.Event] = {}
 
 
-async def play_next(player: wavelink.Player, guild_id: int):
+# ============================================================
+# PER-GUILD PLAYBACK ACTOR
+# ============================================================
+class PlaybackActor:
     """
-    Unified next-track handler
-    Priority:
-    1. Loop
-    2. Queue
-    3. Autoplay
-    4. Cleanup
+    Single owner of a guild's playback state machine
+    - Every transition (play / skip / back / loop / autoplay / track
+      start / track end / stop) goes through one bounded mailbox
+    - One consumer task handles messages strictly in order, so button
+      spam and Lavalink events can never interleave mid-transition
+    - Full mailbox: user messages are dropped (spam protection);
+      Lavalink start / end events and stop are always queued
+    - latency: enqueue → handled, per guild (ms)
     """
 
-    if not player or not player.guild:
-        return
+    def __init__(self, guild_id: int, state):
+        self.guild_id = guild_id
+        self.state = state
+        self.latency = Histogram()
+        self.processed = 0
+        self.dropped = 0
+        self.closed = False
 
-    state = music_states.get(guild_id)
-    if not state:
-        return
+        self._mailbox: asyncio.Queue = asyncio.Queue()
+        self._queued = 0  # droppable (user) messages in the mailbox
+        self._task: Optional[asyncio.Task] = None
+        self._received = 0.0  # when the message being handled was posted
+        self._started: Optional[str] = None  # encoded of the last started track
 
-    # ============================================================
-    # LOOP
-    # ============================================================
-    if state.loop and state.current:
-        await player.play(state.current)
-        return
+    # ==================================================
+    # MAILBOX
+    # ==================================================
+    def post(self, kind: str, data=None) -> Optional[asyncio.Future]:
+        """Queue a message; returns a future for its result (None if dropped)"""
+        if self.closed:
+            return None
 
-    # ============================================================
-    # QUEUE
-    # ============================================================
-    if state.queue:
-        state.previous = state.current
-        state.current = state.queue.pop(0)
-        state.autoplay_seed = state.current
+        if kind not in LIFECYCLE:
+            if self._queued >= MAILBOX_SIZE:
+                self.dropped += 1
+                return None
+            self._queued += 1
 
-        await player.play(state.current)
-        await _update_ui(state, player)
-        return
+        future = asyncio.get_running_loop().create_future()
+        self._mailbox.put_nowait((kind, data, future, time.monotonic()))
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def _run(self):
+        while not self.closed:
+            kind, data, future, queued_at = await self._mailbox.get()
+            self._received = queued_at
+            if kind not in LIFECYCLE:
+                self._queued -= 1
+
+            result = None
+            try:
+                result = await getattr(self, f"_on_{kind}")(data)
+            except Exception as e:
+                print("[PLAYER ACTOR ERROR]", kind, e)
+            finally:
+                self.processed += 1
+                self.latency.observe((time.monotonic() - queued_at) * 1000)
+                if not future.done():
+                    future.set_result(result)
+
+        # Closed: anything still queued gets no result
+        while not self._mailbox.empty():
+            _, _, future, _ = self._mailbox.get_nowait()
+            if not future.done():
+                future.set_result(None)
+        self._queued = 0
+
+    def stats(self) -> dict:
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "mailbox": self._mailbox.qsize(),
+            "latency_ms": self.latency.snapshot(),
+        }
+
+    # ==================================================
+    # TRANSITIONS
+    # ==================================================
+    async def _advance(self, replay_loop: bool) -> Optional[wavelink.Playable]:
+        """
+        Move to the next track
+        Priority: loop (track end only) → queue → autoplay → cleanup
+        """
+        state = self.state
+        player = state.player
+
+        if replay_loop and state.loop and state.current:
+            transition_monitor.cause(self.guild_id, "loop")
+            await player.play(state.current, replace=True)
+            return state.current
+
+        transition_monitor.cause(self.guild_id, "queue")
+        next_track = await next_from_queue(state)
+
+        if next_track is None and state.autoplay:
+            transition_monitor.cause(self.guild_id, "autoplay")
+            try:
+                next_track = await get_autoplay_track(state)
+            except Exception as e:
+                print("[AUTOPLAY ERROR]", e)
+
+        if next_track is None:
+            transition_monitor.cause(self.guild_id, "cleanup")
+            await self._cleanup()
+            return None
+
+        state.advance(next_track)
+        await player.play(next_track, replace=True)
+        return next_track
+
+    async def _on_play(self, track: wavelink.Playable) -> bool:
+        """/play on an idle player; returns False if it got queued instead"""
+        state = self.state
+        player = state.player
+
+        # Another /play may have started playback meanwhile
+        if state.current and (player.playing or player.paused):
+            state.queue.append(track)
+            state.invalidate_autoplay()
+            return False
+
+        state.advance(track)
+        await player.play(track, replace=True)
+        return True
+
+    async def _on_skip(self, target) -> Optional[wavelink.Playable]:
+        """Skip `target` (the track current when skip was pressed)"""
+        current = self.state.current
+        if not current:
+            return None
+
+        # That track already ended (a natural end got there first)
+        if target is not None and target is not current:
+            return None
+        return await self._advance(replay_loop=False)
+
+    async def _on_back(self, _) -> Optional[wavelink.Playable]:
+        state = self.state
+        if not state.previous:
+            return None
+
+        back_track = state.previous.to_playable()
+        state.rewind(back_track)
+
+        await state.player.play(back_track, replace=True)
+        return back_track
+
+    async def _on_loop(self, _) -> bool:
+        state = self.state
+        state.loop = not state.loop
+        state.toggled("loop", state.loop)
+        if state.loop:
+            state.invalidate_autoplay()
+        else:
+            schedule_autoplay(state)
+        return state.loop
+
+    async def _on_autoplay(self, _) -> bool:
+        state = self.state
+        state.autoplay = not state.autoplay
+        state.toggled("autoplay", state.autoplay)
+
+        if state.autoplay and not state.autoplay_seed and state.current:
+            state.autoplay_seed = state.current
+
+        if state.autoplay:
+            schedule_autoplay(state)
+        else:
+            state.invalidate_autoplay()
+        return state.autoplay
+
+    async def _on_start(self, payload: wavelink.TrackStartEventPayload):
+        state = self.state
+
+        # Dead air since the previous track ended (if it ended naturally),
+        # up to when Lavalink reported the start (not when it was handled)
+        transition_monitor.finish(self.guild_id, self._received)
+
+        # previous → current transition trains the local recommender
+        # (a loop replay is the same play again, not a new transition)
+        replay = payload.track.encoded == self._started
+        self._started = payload.track.encoded
+        if not replay:
+            recommender.record(state.previous, payload.track)
+            state.recent.add(payload.track)
+
+        # Next autoplay pick is computed while this track plays
+        schedule_autoplay(state)
+
+        # Panel progress bar follows the new track
+        progress_scheduler.track(self.guild_id)
+
+        # Current song + next few queue entries → lyrics cache
+        lyrics_cache.prefetch(payload.track.title, payload.track.author)
+        for entry in state.queue[:LYRICS_PREFETCH]:
+            lyrics_cache.prefetch(entry.title, entry.author)
+
+    async def _on_end(self, payload: wavelink.TrackEndEventPayload):
+        # The actor replaced the track itself (skip / back / next)
+        if payload.reason == "replaced":
+            return None
+
+        # Late event for a track that is no longer current
+        current = self.state.current
+        if current and payload.track and payload.track.encoded != current.encoded:
+            return None
+
+        transition_monitor.begin(self.guild_id, self._received)
+        return await self._advance(replay_loop=True)
+
+    async def _on_stop(self, _):
+        """Stop / leave: disconnect and drop the session"""
+        state = self.state
+        done = self._detach()
+        transition_monitor.forget(self.guild_id)
 
-    # ============================================================
-    # AUTOPLAY
-    # ============================================================
-    if state.autoplay:
         try:
-            next_track = await get_autoplay_track(state)
-        except Exception as e:
-            print("[AUTOPLAY ERROR]", e)
-            next_track = None
+            await state.player.disconnect(force=True)
+        except Exception:
+            pass
+        finally:
+            state.reset()
+            self._detached(done)
 
-        if next_track:
-            state.previous = state.current
-            state.current = next_track
-            state.autoplay_seed = next_track
+    async def _cleanup(self):
+        """Queue ended: disconnect and mark the panel finished"""
+        state = self.state
+        done = self._detach()
 
-            await player.play(next_track)
-            await _update_ui(state, player)
-            return
+        # Pending panel refreshes must not overwrite the final embed
+        if state.panel:
+            state.panel.cancel()
 
-    # ============================================================
-    # CLEANUP (END OF SESSION)
-    # ============================================================
-    await _cleanup(player, state, guild_id)
+        try:
+            try:
+                await state.player.disconnect(force=True)
+            except Exception:
+                pass
 
+            if state.message:
+                try:
+                    await state.message.edit(
+                        embed=discord.Embed(
+                            title="Playback Finished",
+                            description="Queue ended. Playback stopped.",
+                            color=discord.Color.red(),
+                        ),
+                        view=None,
+                    )
+                except Exception:
+                    pass
+        finally:
+            # Gap ends once cleanup finished
+            transition_monitor.finish(self.guild_id)
+            transition_monitor.forget(self.guild_id)
+            state.reset()
+            self._detached(done)
 
-# ============================================================
-# UI UPDATE (SAFE)
-# ============================================================
-async def _update_ui(state, player):
-    if not state.message:
-        return
+    def _detach(self) -> asyncio.Event:
+        """
+        Session is closing: unbind its state before the first await
+        - A /play meanwhile starts a fresh state (after wait_teardown)
+          instead of binding to this one while it is torn down
+        """
+        self.closed = True
+        progress_scheduler.forget(self.guild_id)
+        if music_states.get(self.guild_id) is self.state:
+            music_states.pop(self.guild_id, None)
+
+        done = _teardowns[self.guild_id] = asyncio.Event()
+        return done
+
+    def _detached(self, done: asyncio.Event):
+        done.set()
+        if _teardowns.get(self.guild_id) is done:
+            del _teardowns[self.guild_id]
 
+
+async def wait_teardown(guild_id: int):
+    """Let a stopping session finish disconnecting before a new one starts"""
+    done = _teardowns.get(guild_id)
+    if done is None:
+        return
     try:
-        await state.message.edit(
-            embed=build_player_embed(state),
-            view=MusicControlView(player, player.guild.id),
-        )
-    except Exception:
+        await asyncio.wait_for(done.wait(), TEARDOWN_WAIT)
+    except asyncio.TimeoutError:
         pass
 
 
+def attach_actor(state, guild_id: int) -> PlaybackActor:
+    """The guild's actor (a new one if the old session was stopped)"""
+    if state.actor is None or state.actor.closed:
+        state.actor = PlaybackActor(guild_id, state)
+    return state.actor
+
+
 # ============================================================
-# CLEANUP (SAFE)
+# QUEUE HEAD (JUST-IN-TIME)
 # ============================================================
-async def _cleanup(player, state, guild_id):
+async def next_from_queue(state) -> Optional[wavelink.Playable]:
+    """
+    Pop the queue head, resolving lazy placeholders just in time
+    - Waits briefly while a playlist is still resolving
+    - Unresolvable entries are skipped
+    - Starts resolving the next few placeholders in the background
+    """
+    while state.queue or await state.wait_for_queue(RESOLVE_WAIT_TIMEOUT):
+        track = await materialize(state.queue.popleft())
+        if track:
+            prefetch_queue(state.queue)
+            return track
+
+    return None
+
+
+# ============================================================
+# BACKGROUND PLAYLIST ENQUEUE
+# ============================================================
+def start_enqueue(state, player, stream, total: int, head=()):
+    """
+    Append the rest of a streamed playlist to the queue in the background
+    - Chained behind any playlist still resolving, so queue order holds
+    - `head` tracks are queued first (already resolved)
+    - Cancelled via state.cancel_resolve() on stop / leave
+    """
+    previous = state.resolve_task if state.is_resolving() else None
+    state.invalidate_autoplay()
+
+    state.resolve_task = asyncio.create_task(
+        _enqueue_stream(state, player, stream, total, list(head), previous)
+    )
+    return state.resolve_task
+
+
+async def _enqueue_stream(state, player, stream, total: int, head, previous):
     try:
-        if player.is_connected():
-            await player.disconnect(force=True)
-    except Exception:
-        pass
+        if previous:
+            await asyncio.wait([previous])
 
-    if state.message:
-        try:
-            await state.message.edit(
-                embed=None,
-                view=None,
-            )
-        except Exception:
-            pass
+        state.queue.extend(head)
+
+        resolved = 1  # the first track was resolved by /play
+        state.report_progress((resolved, total))
+        state.resolve_event.set()
+
+        # Panel follows via state events (coalesced by the PanelUpdater)
+        async for track in stream:
+            # Per-guild cap: drop the rest of the playlist
+            if len(state.queue) >= MAX_QUEUE_LENGTH:
+                break
+
+            state.queue.append(track)
+            resolved += 1
+            state.report_progress((resolved, total))
+            state.resolve_event.set()
+    except asyncio.CancelledError:
+        # Stop / leave cancels the whole chain
+        if previous:
+            previous.cancel()
+        raise
+    except Exception as e:
+        print("[RESOLVE ERROR]", e)
+    finally:
+        await stream.aclose()
+
+    if state.resolve_task is asyncio.current_task():
+        state.resolve_task = None
+        state.report_progress(None)
 
-    state.reset()
-    music_states.pop(guild_id, None)
+    state.resolve_event.set()
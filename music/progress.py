@@ -0,0 +1,109 @@
+import asyncio
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.config import PROGRESS_SLOT, PROGRESS_SLOT_BUDGET
+from music.embed import progress_interval
+from music.panel import refresh_panel
+from music.state import music_states
+
+
+class ProgressScheduler:
+    """
+    One scheduler for every guild's progress refreshes
+    - Min-heap of (due, guild id); one task wakes once per slot
+    - Each slot refreshes at most PROGRESS_SLOT_BUDGET panels (the rest
+      wait for the next slot), so all guilds together stay well under
+      Discord's global request rate
+    - Per tick: O(due · log active guilds); idle guilds cost nothing
+    - Paused players, streams and panel-less sessions are skipped
+    - Refreshes go through the guild's PanelUpdater (coalesced, diffed)
+    """
+
+    def __init__(self, slot: float = PROGRESS_SLOT, budget: int = PROGRESS_SLOT_BUDGET):
+        self.slot = slot
+        self.budget = budget
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}  # guild id → live heap entry
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.paused = 0
+        self.deferred = 0
+
+    def track(self, guild_id: int, delay: Optional[float] = None):
+        """(Re)start progress refreshes for a guild (new track)"""
+        state = music_states.get(guild_id)
+        track = state.current if state else None
+        if delay is None:
+            delay = progress_interval(getattr(track, "length", 0))
+        self._schedule(guild_id, time.monotonic() + delay)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def forget(self, guild_id: int):
+        # Its heap entry goes stale and is dropped when popped
+        self._due.pop(guild_id, None)
+
+    def _schedule(self, guild_id: int, due: float):
+        self._due[guild_id] = due
+        heapq.heappush(self._heap, (due, guild_id))
+
+    async def _run(self):
+        while self._due:
+            await asyncio.sleep(self.slot)
+            self._tick(time.monotonic())
+
+        self._heap.clear()
+
+    def _tick(self, now: float):
+        heap = self._heap
+        handled = 0
+
+        while heap and heap[0][0] <= now:
+            due, guild_id = heap[0]
+            if self._due.get(guild_id) != due:
+                heapq.heappop(heap)  # stale (rescheduled / forgotten)
+                continue
+
+            if handled >= self.budget:
+                # Slot full: everything still due moves to the next slot
+                self.deferred += 1
+                break
+
+            heapq.heappop(heap)
+            handled += 1
+            self._refresh(guild_id, now)
+
+    def _refresh(self, guild_id: int, now: float):
+        state = music_states.get(guild_id)
+        player = state.player if state else None
+        track = state.current if state else None
+
+        if not player or not track or getattr(track, "is_stream", False):
+            self.forget(guild_id)
+            return
+
+        if player.paused:
+            self.paused += 1
+        elif state.message:
+            refresh_panel(state, guild_id)
+            self.refreshes += 1
+
+        # Next refresh when the shown position moves to the next interval
+        step = progress_interval(track.length)
+        self._schedule(guild_id, now + step - (max(player.position, 0) / 1000) % step)
+
+    def stats(self) -> dict:
+        return {
+            "guilds": len(self._due),
+            "refreshes": self.refreshes,
+            "paused_skips": self.paused,
+            "deferred_slots": self.deferred,
+        }
+
+
+# GLOBAL INSTANCE
+progress_scheduler = ProgressScheduler()
@@ -0,0 +1,254 @@
+import random
+from collections import deque
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from core.config import QUEUE_SPILL_DIR, QUEUE_SPILL_THRESHOLD, QUEUE_SPILL_WINDOW
+from music.spill import SpillSegment
+from music.track import compact
+
+
+def _length(entry) -> int:
+    # Streams / unknown lengths count as 0 toward the queue ETA
+    return getattr(entry, "length", 0) or 0
+
+
+class TrackQueue:
+    """
+    Per-guild play queue (drop-in for the old list)
+    - Resolved tracks are stored as compact TrackRecords
+    - O(1) popleft / append at either end (deque)
+    - insert / pop / move by position: O(min(i, n - i))
+    - Head slices (queue[:n]) only walk n entries
+    - Running total duration for whole-queue ETA
+    - Shuffle in place
+    - on_change() is called once after every mutation (state version)
+
+    Past `spill_threshold` entries only a head and a tail window stay
+    in memory; the middle is spilled to a SpillSegment on disk.
+    Order is always head → spilled middle → tail.
+    """
+
+    __slots__ = ("_head", "_spill", "_tail", "duration", "spill_threshold", "window", "on_change")
+
+    def __init__(
+        self,
+        entries: Iterable = (),
+        *,
+        spill_threshold: int = QUEUE_SPILL_THRESHOLD,
+        window: int = QUEUE_SPILL_WINDOW,
+    ):
+        self._head = deque()
+        self._spill: Optional[SpillSegment] = None
+        self._tail = deque()
+        self.duration = 0
+        self.spill_threshold = spill_threshold
+        self.window = window
+        self.on_change: Optional[Callable[[], None]] = None
+        self.extend(entries)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    # ==================================================
+    # SPILL WINDOWS
+    # ==================================================
+    def _start_spill(self):
+        try:
+            self._spill = SpillSegment(QUEUE_SPILL_DIR)
+        except OSError as e:
+            print("[QUEUE SPILL ERROR]", e)
+            self.spill_threshold = 0  # keep this queue in memory
+            return
+
+        overflow = [self._head.pop() for _ in range(len(self._head) - self.window)]
+        overflow.reverse()
+        self._spill.extend(overflow)
+
+    def _balance(self):
+        """Keep the head window filled and the tail window bounded"""
+        spill = self._spill
+
+        if spill is None:
+            if self.spill_threshold and len(self._head) > max(self.spill_threshold, 2 * self.window):
+                self._start_spill()
+            return
+
+        # Tail full: spill its older half in one write
+        if len(self._tail) >= 2 * self.window:
+            spill.extend([self._tail.popleft() for _ in range(self.window)])
+
+        # Head low: pull the next window back into memory
+        if len(self._head) < self.window // 2:
+            self._head.extend(spill.take(self.window - len(self._head)))
+
+        # Middle drained: back to a plain in-memory queue
+        if not spill:
+            self._head.extend(self._tail)
+            self._tail.clear()
+            spill.close()
+            self._spill = None
+
+    def _locate(self, index: int):
+        """(part, index within part) for a queue position"""
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("queue index out of range")
+
+        if index < len(self._head):
+            return self._head, index
+        index -= len(self._head)
+
+        if self._spill is not None and index < len(self._spill):
+            return self._spill, index
+        return self._tail, index - len(self._spill or ())
+
+    # ==================================================
+    # ADD
+    # ==================================================
+    def _append(self, entry):
+        entry = compact(entry)
+        (self._head if self._spill is None else self._tail).append(entry)
+        self.duration += _length(entry)
+        self._balance()
+
+    def append(self, entry):
+        self._append(entry)
+        self._changed()
+
+    def appendleft(self, entry):
+        entry = compact(entry)
+        self._head.appendleft(entry)
+        self.duration += _length(entry)
+        self._balance()
+        self._changed()
+
+    def extend(self, entries: Iterable):
+        size = len(self)
+        for entry in entries:
+            self._append(entry)
+        if len(self) != size:
+            self._changed()
+
+    def insert(self, index: int, entry):
+        entry = compact(entry)
+        size = len(self)
+        index = max(0, min(size, index + size if index < 0 else index))
+
+        if index <= len(self._head) or self._spill is None:
+            self._head.insert(index, entry)
+        elif index - len(self._head) < len(self._spill):
+            self._spill.insert(index - len(self._head), entry)
+        else:
+            self._tail.insert(index - len(self._head) - len(self._spill), entry)
+
+        self.duration += _length(entry)
+        self._balance()
+        self._changed()
+
+    # ==================================================
+    # REMOVE
+    # ==================================================
+    def popleft(self):
+        if self._head:
+            entry = self._head.popleft()
+        elif self._spill:
+            entry = self._spill.pop(0)
+        else:
+            entry = self._tail.popleft()
+
+        self.duration -= _length(entry)
+        self._balance()
+        self._changed()
+        return entry
+
+    def pop(self, index: int = -1):
+        """Remove and return the entry at index (0 / -1 are O(1))"""
+        if index == 0:
+            return self.popleft()
+
+        part, position = self._locate(index)
+        if isinstance(part, SpillSegment):
+            entry = part.pop(position)
+        elif position == len(part) - 1:
+            entry = part.pop()
+        else:
+            entry = part[position]
+            del part[position]
+
+        self.duration -= _length(entry)
+        self._balance()
+        self._changed()
+        return entry
+
+    def clear(self):
+        self._head.clear()
+        self._tail.clear()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self.duration = 0
+        self._changed()
+
+    # ==================================================
+    # REORDER
+    # ==================================================
+    def move(self, source: int, target: int):
+        """Move the entry at source so it ends up at target"""
+        self.insert(target, self.pop(source))
+
+    def shuffle(self):
+        spill = self._spill
+        if spill is None:
+            items = list(self._head)
+            random.shuffle(items)
+            self._head = deque(items)
+            self._changed()
+            return
+
+        # Shuffle in-memory entries and spilled offsets together;
+        # spilled records are only loaded if they land in the head
+        refs = [*self._head, *spill.refs(), *self._tail]
+        random.shuffle(refs)
+
+        head, middle = refs[:self.window], refs[self.window:]
+        self._head = deque(spill.read(r) if isinstance(r, int) else r for r in head)
+        self._tail.clear()
+        spill.replace([r if isinstance(r, int) else spill.write(r) for r in middle])
+        self._balance()
+        self._changed()
+
+    # ==================================================
+    # READ
+    # ==================================================
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step
+            if start >= 0 and (stop is None or stop >= 0) and (step or 1) > 0:
+                return list(islice(self, start, stop, step))
+            return list(self)[index]
+
+        part, position = self._locate(index)
+        if isinstance(part, SpillSegment):
+            return part.get(position)
+        return part[position]
+
+    def __iter__(self) -> Iterator:
+        return chain(self._head, self._spill or (), self._tail)
+
+    def __len__(self) -> int:
+        return len(self._head) + len(self._spill or ()) + len(self._tail)
+
+    def __bool__(self) -> bool:
+        return bool(self._head or self._spill or self._tail)
+
+    @property
+    def spilled(self) -> int:
+        """Entries currently on disk"""
+        return len(self._spill or ())
+
+    def __repr__(self) -> str:
+        return f"<TrackQueue size={len(self)} spilled={self.spilled} duration={self.duration}>"
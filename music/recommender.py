@@ -0,0 +1,396 @@
+import asyncio
+import base64
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+import wavelink
+
+from core.config import (
+    RECOMMENDER_MAX_EDGES,
+    RECOMMENDER_MAX_TRACKS,
+    RECOMMENDER_PATH,
+    RECOMMENDER_REBUILD_EVERY,
+)
+
+TOP_K = 5  # weighted random pick among the best K followers
+
+
+# ============================================================
+# LAVALINK ENCODED TRACKS
+# ============================================================
+class _Reader:
+    """Java DataInput reader over a Lavalink encoded track"""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size: int) -> bytes:
+        chunk = self.data[self.pos:self.pos + size]
+        if len(chunk) != size:
+            raise ValueError("truncated track")
+        self.pos += size
+        return chunk
+
+    def number(self, size: int) -> int:
+        return int.from_bytes(self.take(size), "big", signed=True)
+
+    def text(self) -> str:
+        # Java modified UTF-8 (surrogate pairs encoded separately)
+        raw = self.take(self.number(2) & 0xFFFF).decode("utf-8", "surrogatepass")
+        return raw.encode("utf-16", "surrogatepass").decode("utf-16")
+
+    def optional_text(self) -> Optional[str]:
+        return self.text() if self.number(1) else None
+
+
+def decode_payload(encoded: str) -> Optional[dict]:
+    """
+    Lavalink track payload from an encoded track (no REST call)
+    - Reads the track info header (format versions 1-3)
+    - None if the string is not a valid encoded track
+    """
+    try:
+        reader = _Reader(base64.b64decode(encoded))
+        versioned = (reader.number(4) >> 30) & 1
+        version = reader.number(1) if versioned else 1
+
+        title = reader.text()
+        author = reader.text()
+        length = reader.number(8)
+        identifier = reader.text()
+        is_stream = bool(reader.number(1))
+        uri = reader.optional_text() if version >= 2 else None
+        artwork = reader.optional_text() if version >= 3 else None
+        isrc = reader.optional_text() if version >= 3 else None
+        source = reader.text()
+    except (ValueError, UnicodeError):
+        return None
+
+    return {
+        "encoded": encoded,
+        "info": {
+            "identifier": identifier,
+            "isSeekable": not is_stream,
+            "author": author,
+            "length": length,
+            "isStream": is_stream,
+            "position": 0,
+            "title": title,
+            "uri": uri,
+            "artworkUrl": artwork,
+            "isrc": isrc,
+            "sourceName": source,
+        },
+        "pluginInfo": {},
+        "userData": {},
+    }
+
+
+# ============================================================
+# FOLLOWER MATRIX
+# ============================================================
+def build_csr(path: str, size: int, max_edges: int):
+    """
+    Build CSR arrays for the follower matrix (runs in a worker process)
+    - Reads the edges straight from SQLite (nothing large is pickled)
+    - Over max_edges: the weakest edges are dropped first
+    Returns (indptr, indices, data, popularity)
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        excess = conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0] - max_edges
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM edges WHERE (a, b) IN"
+                " (SELECT a, b FROM edges ORDER BY count LIMIT ?)",
+                (excess,),
+            )
+            conn.commit()
+
+        edges = np.array(
+            conn.execute("SELECT a, b, count FROM edges WHERE a < ? AND b < ?", (size, size)).fetchall(),
+            dtype=np.float64,
+        ).reshape(-1, 3)
+    finally:
+        conn.close()
+
+    rows = edges[:, 0].astype(np.int32)
+    cols = edges[:, 1].astype(np.int32)
+    counts = edges[:, 2].astype(np.float32)
+
+    order = np.lexsort((cols, rows))
+    rows, cols, counts = rows[order], cols[order], counts[order]
+
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+
+    # How often each track is followed into; damps globally popular tracks
+    popularity = np.bincount(cols, weights=counts, minlength=size).astype(np.float32)
+
+    return indptr, cols, counts, popularity
+
+
+class CooccurrenceRecommender:
+    """
+    Local autoplay recommender trained from the bot's own play history
+    - Counts which track follows which, across all guilds
+    - Scores from a CSR sparse matrix with NumPy (no network)
+    - Memory: one Lavalink encoded string per track + the matrix;
+      edge counts live in SQLite (capped at max_edges)
+    - Every N new transitions: only the new tracks / edge increments
+      are upserted, then the matrix is rebuilt in a worker process
+    """
+
+    def __init__(self, path: str, rebuild_every: int, max_tracks: int, max_edges: int):
+        self.path = path
+        self.rebuild_every = rebuild_every
+        self.max_tracks = max_tracks
+        self.max_edges = max_edges
+
+        self._ids: dict[str, int] = {}
+        self._encoded: list[str] = []
+        self._new_tracks: list[tuple[int, str, str]] = []
+        self._new_edges: dict[tuple[int, int], int] = {}
+        self._pending = 0  # transitions since the last rebuild
+
+        self._csr = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.cold = 0
+        self.rebuilds = 0
+        self.edges = 0
+
+    # ==================================================
+    # TRAINING
+    # ==================================================
+    def _index(self, track) -> Optional[int]:
+        key = getattr(track, "identifier", None)
+        encoded = getattr(track, "encoded", None)
+        if not key or not encoded:
+            return None
+
+        index = self._ids.get(key)
+        if index is None:
+            if len(self._encoded) >= self.max_tracks:
+                return None
+            index = self._ids[key] = len(self._encoded)
+            self._encoded.append(encoded)
+            self._new_tracks.append((index, key, encoded))
+        return index
+
+    def record(self, previous, track):
+        """Count one transition previous → track"""
+        if not previous or not track:
+            return
+
+        # Autoplay picks are not user choices; training on them
+        # would only reinforce the recommender's own output
+        if getattr(track.extras, "autoplay", False):
+            return
+
+        if getattr(previous, "identifier", None) == getattr(track, "identifier", None):
+            return
+
+        a, b = self._index(previous), self._index(track)
+        if a is None or b is None:
+            return
+
+        self._new_edges[(a, b)] = self._new_edges.get((a, b), 0) + 1
+        self._pending += 1
+
+        if self._pending >= self.rebuild_every:
+            self.schedule_rebuild()
+
+    def schedule_rebuild(self):
+        if self._rebuild_task and not self._rebuild_task.done():
+            return
+        self._pending = 0
+        self._rebuild_task = asyncio.create_task(self._rebuild())
+
+    async def _rebuild(self):
+        tracks, edges = self._new_tracks, self._new_edges
+        self._new_tracks, self._new_edges = [], {}
+        size = len(self._encoded)
+
+        try:
+            await asyncio.to_thread(self._persist, tracks, edges)
+        except Exception as e:
+            print("[RECOMMENDER ERROR]", e)
+            # Keep the increments for the next attempt
+            self._new_tracks[:0] = tracks
+            for edge, count in edges.items():
+                self._new_edges[edge] = self._new_edges.get(edge, 0) + count
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+
+        loop = asyncio.get_running_loop()
+        try:
+            self._csr = await loop.run_in_executor(
+                self._executor, build_csr, self.path, size, self.max_edges
+            )
+            self.rebuilds += 1
+            self.edges = len(self._csr[1])
+        except Exception as e:
+            print("[RECOMMENDER ERROR]", e)
+
+    # ==================================================
+    # SCORING
+    # ==================================================
+    def recommend(self, seed, skip: Callable = None) -> Optional[wavelink.Playable]:
+        """
+        Best follower of seed (weighted among top K), None on cold start
+        skip(track) → True drops a candidate (recent history, lineage)
+        """
+        csr = self._csr
+        index = self._ids.get(getattr(seed, "identifier", None))
+
+        if csr is None or index is None or index + 1 >= len(csr[0]):
+            self.cold += 1
+            return None
+
+        indptr, indices, data, popularity = csr
+        start, end = indptr[index], indptr[index + 1]
+
+        followers = indices[start:end]
+        scores = data[start:end] / np.sqrt(popularity[followers])
+
+        # Walk best-first; each skip check is O(1)
+        top, weights = [], []
+        for i in np.argsort(scores)[::-1]:
+            payload = decode_payload(self._encoded[followers[i]])
+            if payload is None:
+                continue
+            track = wavelink.Playable(payload)
+            if skip and skip(track):
+                continue
+            top.append(track)
+            weights.append(scores[i])
+            if len(top) == TOP_K:
+                break
+
+        if not top:
+            self.cold += 1
+            return None
+
+        weights = np.asarray(weights) / sum(weights)
+        self.hits += 1
+        return top[np.random.choice(len(top), p=weights)]
+
+    # ==================================================
+    # PERSISTENCE
+    # ==================================================
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                " id INTEGER PRIMARY KEY,"
+                " identifier TEXT NOT NULL UNIQUE,"
+                " encoded TEXT NOT NULL"
+                ")"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS edges ("
+                " a INTEGER NOT NULL,"
+                " b INTEGER NOT NULL,"
+                " count REAL NOT NULL,"
+                " PRIMARY KEY (a, b)"
+                ") WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _persist(self, tracks, edges):
+        """Upsert new tracks + edge increments (never the whole model)"""
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR IGNORE INTO tracks (id, identifier, encoded) VALUES (?, ?, ?)",
+                tracks,
+            )
+            conn.executemany(
+                "INSERT INTO edges (a, b, count) VALUES (?, ?, ?)"
+                " ON CONFLICT (a, b) DO UPDATE SET count = count + excluded.count",
+                [(a, b, count) for (a, b), count in edges.items()],
+            )
+            conn.commit()
+
+    def _read(self):
+        with self._lock:
+            return self._connect().execute("SELECT id, identifier, encoded FROM tracks ORDER BY id").fetchall()
+
+    async def load(self):
+        """Restore the track index and build the first matrix"""
+        try:
+            rows = await asyncio.to_thread(self._read)
+        except Exception as e:
+            print("[RECOMMENDER ERROR]", e)
+            return
+
+        for index, key, encoded in rows:
+            # Ids are dense from 0; anything out of line is left out
+            if index != len(self._encoded) or key in self._ids:
+                break
+            self._ids[key] = index
+            self._encoded.append(encoded)
+
+        if self._encoded:
+            self.schedule_rebuild()
+
+    def close(self):
+        # Increments since the last rebuild (a few hundred rows at most)
+        if self._new_tracks or self._new_edges:
+            try:
+                self._persist(self._new_tracks, self._new_edges)
+            except Exception as e:
+                print("[RECOMMENDER ERROR]", e)
+            self._new_tracks, self._new_edges = [], {}
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "tracks": len(self._encoded),
+            "edges": self.edges,
+            "pending": self._pending,
+            "hits": self.hits,
+            "cold": self.cold,
+            "rebuilds": self.rebuilds,
+        }
+
+
+# GLOBAL INSTANCE
+recommender = CooccurrenceRecommender(
+    RECOMMENDER_PATH,
+    rebuild_every=RECOMMENDER_REBUILD_EVERY,
+    max_tracks=RECOMMENDER_MAX_TRACKS,
+    max_edges=RECOMMENDER_MAX_EDGES,
+)
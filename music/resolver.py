@@ -1,76 +1,355 @@
+import asyncio
+import contextlib
+import re
+from typing import AsyncIterator, List, Optional, Tuple
+
 import wavelink
-from services.spotify import spotify_search
+from core.config import (
+    EAGER_RESOLVE_TRACKS,
+    PLAYLIST_MAX_TRACKS,
+    QUEUE_LOOKAHEAD,
+    RESOLVER_CONCURRENCY,
+)
+from music.match_index import match_index
+from music.search import search_tracks
+from music.track import PendingTrack, TrackRecord, remember_requester, requester_extras
+from services.spotify import (
+    spotify_album_pages,
+    spotify_playlist_pages,
+    spotify_tracks,
+)
+
+PLAYLIST_CHUNK_SIZE = 50  # native playlist tracks enqueued per loop turn
+
+
+class ResolvePlan:
+    """
+    Ordered Lavalink search terms for one user query
+    Built up front so callers know the total before streaming
+    - searches: resolved eagerly (bounded concurrency)
+    - matches: (spotify_id, isrc) per search, for the match index
+    - pending: queued as PendingTrack placeholders
+    - direct: single URL handed straight to Lavalink's loader
+      (total becomes known once a playlist has loaded)
+    - pages: later Spotify pages, fetched by iter_tracks while the
+      first tracks already play (expected: the listing's size)
+    """
+
+    __slots__ = (
+        "searches",
+        "matches",
+        "pending",
+        "autocorrected",
+        "direct",
+        "loaded",
+        "pages",
+        "expected",
+    )
+
+    def __init__(
+        self,
+        searches: List[str],
+        autocorrected: bool = False,
+        pending: List[PendingTrack] = None,
+        direct: bool = False,
+        matches: List[Tuple[str, str]] = None,
+    ):
+        self.searches = searches
+        self.matches = matches or [None] * len(searches)
+        self.pending = pending or []
+        self.autocorrected = autocorrected
+        self.direct = direct
+        self.loaded: Optional[int] = None
+        self.pages: Optional[AsyncIterator] = None
+        self.expected: Optional[int] = None
+
+    @property
+    def total(self) -> int:
+        if self.loaded is not None:
+            return self.loaded
+        if self.expected is not None:
+            return self.expected
+        return len(self.searches) + len(self.pending)
+
 
-MAX_PLAYLIST_TRACKS = 50  # Lavalink safety limit
+# ============================================================
+# QUERY CLASSIFICATION
+# ============================================================
+SPOTIFY_URL = re.compile(
+    r"(?:open\.spotify\.com/(?:intl-[\w-]+/)?|spotify:)"
+    r"(playlist|album|track)[/:]([A-Za-z0-9]+)"
+)
+
+
+def classify_query(query: str):
+    """
+    Returns (kind, value):
+    - ("spotify_playlist" | "spotify_album" | "spotify_track", spotify id)
+    - ("url", url) for any other link (YouTube, YT Music, SoundCloud, ...)
+    - ("search", query) for plain text
+    """
+    query = query.strip()
+
+    match = SPOTIFY_URL.search(query)
+    if match:
+        return f"spotify_{match.group(1)}", match.group(2)
+
+    if re.match(r"https?://", query, re.IGNORECASE):
+        return "url", query
 
+    return "search", query
 
-async def resolve_tracks(query: str, requester):
+
+async def plan_query(query: str, requester) -> ResolvePlan:
     """
-    Resolve user query into playable Wavelink tracks.
+    Expand user query into search terms.
     Supports:
-    - Spotify playlists
+    - Spotify playlists / albums / tracks (batch endpoints; only the
+      first page is fetched here, items past EAGER_RESOLVE_TRACKS
+      become lazy placeholders)
+    - Direct links and native playlists (no search round trip)
     - YouTube / YouTube Music search
-    - Safe requester metadata injection
     """
 
-    tracks = []
+    kind, value = classify_query(query)
 
     # ============================================================
-    # SPOTIFY PLAYLIST
+    # SPOTIFY
     # ============================================================
-    if "spotify.com/playlist" in query:
-        pid = query.split("/")[-1].split("?")[0]
+    if kind == "spotify_playlist":
+        return await _plan_pages(spotify_playlist_pages(value, PLAYLIST_MAX_TRACKS), requester)
 
-        data = spotify_search(
-            playlist_id=pid,
-            limit=MAX_PLAYLIST_TRACKS,
-        )
+    if kind == "spotify_album":
+        return await _plan_pages(spotify_album_pages(value, PLAYLIST_MAX_TRACKS), requester)
 
-        if not data or "items" not in data:
-            return []
+    if kind == "spotify_track":
+        return _plan_spotify(await spotify_tracks([value]), requester)
+
+    # ============================================================
+    # DIRECT URL (YT / YTM / SOUNDCLOUD / ...)
+    # ============================================================
+    if kind == "url":
+        return ResolvePlan([value], direct=True)
+
+    # ============================================================
+    # NORMAL SEARCH (YT / YTM)
+    # ============================================================
+    return ResolvePlan([f"ytmsearch:{value}"], autocorrected=True)
+
+
+async def _plan_pages(pages: AsyncIterator, requester) -> ResolvePlan:
+    """Plan the first Spotify page now; iter_tracks fetches the rest"""
+    first = await anext(pages, None)
+    if first is None:
+        return ResolvePlan([])
+
+    items, total = first
+    plan = _plan_spotify(items, requester)
+    plan.pages = pages
+    plan.expected = total
+    return plan
 
-        for item in data["items"][:MAX_PLAYLIST_TRACKS]:
-            track_data = item.get("track")
-            if not track_data:
-                continue
 
-            search = f"{track_data['name']} {track_data['artists'][0]['name']}"
+def _plan_spotify(items: List[dict], requester, eager: int = EAGER_RESOLVE_TRACKS) -> ResolvePlan:
+    remember_requester(requester)
 
-            try:
-                results = await wavelink.Playable.search(
-                    f"ytmsearch:{search}"
+    searches = []
+    matches = []
+    pending = []
+    for track_data in items:
+        artists = track_data.get("artists") or [{"name": ""}]
+        spotify_id = track_data.get("id")
+        isrc = (track_data.get("external_ids") or {}).get("isrc")
+
+        if len(searches) < eager:
+            searches.append(
+                f"ytmsearch:{track_data['name']} {artists[0]['name']}"
+            )
+            matches.append((spotify_id, isrc))
+        else:
+            pending.append(
+                PendingTrack(
+                    track_data["name"],
+                    artists[0]["name"],
+                    track_data.get("duration_ms") or 0,
+                    requester.id,
+                    spotify_id=spotify_id,
+                    isrc=isrc,
                 )
-            except Exception as e:
-                print("[LAVALINK SEARCH ERROR]", e)
-                continue
+            )
+
+    return ResolvePlan(searches, pending=pending, matches=matches)
+
+
+async def iter_tracks(
+    plan: ResolvePlan,
+    requester,
+    concurrency: int = None,
+) -> AsyncIterator[wavelink.Playable]:
+    """
+    Stream resolved tracks in plan order.
+    - Up to `concurrency` searches run ahead of the consumer
+    - Failed items are skipped without stalling the rest
+    - Later Spotify pages are fetched as the consumer reaches them
+    - Closing the generator cancels outstanding searches
+    """
+
+    if plan.direct:
+        async for track in _iter_direct(plan, requester):
+            yield track
+        return
+
+    semaphore = asyncio.Semaphore(concurrency or RESOLVER_CONCURRENCY)
+    try:
+        async with contextlib.aclosing(_iter_planned(plan, requester, semaphore)) as entries:
+            async for entry in entries:
+                yield entry
 
-            if not results:
+        if plan.pages is None:
+            return
+
+        # Later Spotify pages: fetched while the first tracks already play
+        eager = EAGER_RESOLVE_TRACKS - len(plan.searches)
+        async for items, _ in plan.pages:
+            page = _plan_spotify(items, requester, max(0, eager))
+            eager -= len(page.searches)
+            async with contextlib.aclosing(_iter_planned(page, requester, semaphore)) as entries:
+                async for entry in entries:
+                    yield entry
+    finally:
+        if plan.pages is not None:
+            await plan.pages.aclose()
+
+
+async def _iter_planned(plan: ResolvePlan, requester, semaphore: asyncio.Semaphore):
+    """One plan's searches in order, then its placeholders"""
+    pending = [
+        asyncio.ensure_future(_search_first(search, semaphore, match))
+        for search, match in zip(plan.searches, plan.matches)
+    ]
+
+    try:
+        for future in pending:
+            track = await future
+            if not track:
                 continue
 
-            track = results[0]
-            _inject_requester(track, requester)
-            tracks.append(track)
+            _inject_requester(track, requester, autocorrected=plan.autocorrected)
+            yield track
+    finally:
+        for future in pending:
+            future.cancel()
 
-        return tracks
+    # Placeholders are queued as-is and resolved near the queue head
+    for entry in plan.pending:
+        yield entry
+
+
+async def _iter_direct(plan: ResolvePlan, requester):
+    """
+    Load a URL through Lavalink's loader (no search prefix)
+    Native playlists are yielded in bounded chunks
+    """
 
-    # ============================================================
-    # NORMAL SEARCH (YT / YTM)
-    # ============================================================
     try:
-        results = await wavelink.Playable.search(
-            f"ytmsearch:{query}"
-        )
+        results = await search_tracks(plan.searches[0])
     except Exception as e:
-        print("[SEARCH ERROR]", e)
-        return []
+        print("[LAVALINK LOAD ERROR]", e)
+        return
+
+    if isinstance(results, wavelink.Playlist):
+        tracks = results.tracks[:PLAYLIST_MAX_TRACKS]
+    else:
+        tracks = results[:1]
+
+    plan.loaded = len(tracks)
+
+    for index, track in enumerate(tracks, start=1):
+        _inject_requester(track, requester)
+        yield track
+
+        # Let other guilds' events run between chunks
+        if index % PLAYLIST_CHUNK_SIZE == 0:
+            await asyncio.sleep(0)
+
+
+async def resolve_tracks(query: str, requester, concurrency: int = None):
+    """
+    Resolve user query into a full list of queue entries
+    """
+
+    plan = await plan_query(query, requester)
+    return [track async for track in iter_tracks(plan, requester, concurrency)]
+
+
+# ============================================================
+# JUST-IN-TIME PLACEHOLDER RESOLUTION
+# ============================================================
+def _prefetch(entry: PendingTrack) -> asyncio.Task:
+    """Start (or reuse) the background search for a placeholder"""
+    if entry.task is None:
+        entry.task = asyncio.create_task(_resolve_pending(entry))
+    return entry.task
+
+
+async def _resolve_pending(entry: PendingTrack) -> Optional[wavelink.Playable]:
+    track = await _search_first(entry.search, match=(entry.spotify_id, entry.isrc))
+    if track:
+        track.extras = requester_extras(entry.requester_id)
+    return track
+
+
+async def materialize(entry) -> Optional[wavelink.Playable]:
+    """Return a playable track for a queue entry (None if unresolvable)"""
+    if isinstance(entry, PendingTrack):
+        return await _prefetch(entry)
+    if isinstance(entry, TrackRecord):
+        return entry.to_playable()
+    return entry
+
+
+def prefetch_queue(queue, lookahead: int = QUEUE_LOOKAHEAD):
+    """Start resolving placeholders near the head of the queue"""
+    for entry in queue[:lookahead]:
+        if isinstance(entry, PendingTrack):
+            _prefetch(entry)
+
+
+# ============================================================
+# SINGLE ITEM SEARCH (BOUNDED)
+# ============================================================
+async def _search_first(
+    search: str,
+    semaphore: asyncio.Semaphore = None,
+    match: Tuple[str, str] = None,
+):
+    """
+    Search a single item, holding one concurrency slot.
+    Spotify items (match = (spotify_id, isrc)) check the match index
+    first and record the chosen track after a search.
+    Returns None on failure so one bad item never stalls the rest.
+    """
+
+    if match:
+        payload = await match_index.get(*match)
+        if payload:
+            return wavelink.Playable(payload)
+
+    async with semaphore or contextlib.nullcontext():
+        try:
+            results = await search_tracks(search)
+        except Exception as e:
+            print("[LAVALINK SEARCH ERROR]", e)
+            return None
 
     if not results:
-        return []
+        return None
 
     track = results[0]
-    _inject_requester(track, requester, autocorrected=True)
+    if match:
+        await match_index.put(*match, track.raw_data)
 
-    return [track]
+    return track
 
 
 # ============================================================
@@ -81,6 +360,8 @@ def _inject_requester(track: wavelink.Playable, requester, autocorrected=False):
     Safely attach requester metadata to Wavelink track
     """
 
+    remember_requester(requester)
+
     if not hasattr(track, "extras") or not track.extras:
         track.extras = {}
 
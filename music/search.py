@@ -0,0 +1,90 @@
+import asyncio
+import copy
+
+import wavelink
+
+from music.search_cache import normalize_query, search_cache
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical lookups into one in-flight task
+    - The first caller starts the task, later callers await it
+    - A cancelled caller never cancels the shared task
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn):
+        """Returns (result, shared); shared is True for coalesced callers"""
+        self.calls += 1
+
+        task = self._inflight.get(key)
+        shared = task is not None
+
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+
+# GLOBAL INSTANCE
+search_flight = SingleFlight()
+
+
+async def search_tracks(query: str) -> wavelink.Search:
+    """
+    Cached, coalesced Lavalink search
+    - Repeat queries skip the Lavalink REST round trip
+    - Concurrent identical queries share one Lavalink request
+    - Every caller gets its own Playable objects (own extras)
+    - Playlist results are passed through uncached
+    - Search errors propagate and are never cached
+    """
+
+    payloads = await search_cache.get(query)
+    if payloads is not None:
+        return [wavelink.Playable(data) for data in payloads]
+
+    results, shared = await search_flight.do(
+        normalize_query(query),
+        lambda: _fetch(query),
+    )
+
+    if shared:
+        return _copy_results(results)
+    return results
+
+
+async def _fetch(query: str) -> wavelink.Search:
+    results = await wavelink.Playable.search(query)
+
+    if not isinstance(results, wavelink.Playlist):
+        await search_cache.put(query, [track.raw_data for track in results])
+
+    return results
+
+
+def _copy_results(results: wavelink.Search) -> wavelink.Search:
+    """Fresh Playable copies so coalesced callers never share extras"""
+    if isinstance(results, wavelink.Playlist):
+        playlist = copy.copy(results)
+        playlist.tracks = _copy_results(results.tracks)
+        return playlist
+
+    return [wavelink.Playable(track.raw_data) for track in results]
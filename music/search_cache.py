@@ -0,0 +1,120 @@
+import asyncio
+import json
+import re
+import time
+from typing import List, Optional
+
+from core.config import (
+    SEARCH_CACHE_MEMORY_SIZE,
+    SEARCH_CACHE_NEGATIVE_TTL,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTL,
+)
+from core.store import LRUCache, SQLiteStore
+
+MAX_CACHED_RESULTS = 10  # autoplay samples from the top 5
+
+
+def normalize_query(query: str) -> str:
+    """Cache key: case-folded, whitespace-collapsed query (URLs keep case)"""
+    query = re.sub(r"\s+", " ", query).strip()
+    if "://" in query:
+        return query
+    return query.casefold()
+
+
+class SearchCache:
+    """
+    Two-tier Lavalink search cache
+    - In-memory LRU in front of on-disk SQLite
+    - Stores raw track payloads (encoded track + info)
+    - Empty result lists are cached with a shorter TTL
+    """
+
+    def __init__(
+        self,
+        path: str,
+        memory_size: int,
+        ttl: float,
+        negative_ttl: float,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._memory = LRUCache(memory_size)
+        self._disk = SQLiteStore(path, "search_results")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    async def get(self, query: str) -> Optional[List[dict]]:
+        """
+        Returns cached raw payloads ([] = known empty result)
+        Returns None on a miss
+        """
+        key = normalize_query(query)
+
+        payloads = self._memory.get(key)
+        if payloads is not None:
+            self.memory_hits += 1
+            self._count_negative(payloads)
+            return payloads
+
+        try:
+            row = await asyncio.to_thread(self._disk.get_with_expiry, key)
+        except Exception as e:
+            print("[SEARCH CACHE ERROR]", e)
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = row
+        payloads = json.loads(value)
+
+        self._memory.set(key, payloads, expires_at)
+        self.disk_hits += 1
+        self._count_negative(payloads)
+        return payloads
+
+    async def put(self, query: str, payloads: List[dict]):
+        key = normalize_query(query)
+        payloads = payloads[:MAX_CACHED_RESULTS]
+        ttl = self.ttl if payloads else self.negative_ttl
+
+        self._memory.set(key, payloads, time.time() + ttl)
+
+        try:
+            await asyncio.to_thread(
+                self._disk.set, key, json.dumps(payloads).encode(), ttl
+            )
+        except Exception as e:
+            print("[SEARCH CACHE ERROR]", e)
+
+    def _count_negative(self, payloads: List[dict]):
+        if not payloads:
+            self.negative_hits += 1
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# GLOBAL INSTANCE
+search_cache = SearchCache(
+    SEARCH_CACHE_PATH,
+    memory_size=SEARCH_CACHE_MEMORY_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    negative_ttl=SEARCH_CACHE_NEGATIVE_TTL,
+)
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Iterable, Iterator, List, Optional
+
+from music.track import PendingTrack, TrackRecord
+
+_HEADER = struct.Struct("<I")  # record length prefix
+COMPACT_MIN_DEAD = 1024  # dead records tolerated before compacting
+
+
+# ============================================================
+# RECORD SERIALIZATION
+# ============================================================
+def entry_fields(entry: TrackRecord) -> list:
+    """JSON-able field list for a queue entry"""
+    fields = [
+        entry.encoded,
+        entry.identifier,
+        entry.title,
+        entry.author,
+        entry.length,
+        entry.uri,
+        entry.artwork,
+        entry.source,
+        entry.is_stream,
+        entry.requester_id,
+        entry.autocorrected,
+    ]
+    if isinstance(entry, PendingTrack):
+        fields += [entry.spotify_id, entry.isrc]
+    return fields
+
+
+def entry_from_fields(fields: list) -> TrackRecord:
+    if len(fields) == 11:
+        return TrackRecord(*fields)
+
+    # Placeholder: title, author, length, requester id + Spotify match keys
+    return PendingTrack(
+        fields[2],
+        fields[3],
+        fields[4],
+        fields[9],
+        spotify_id=fields[11],
+        isrc=fields[12],
+    )
+
+
+def dump_entry(entry: TrackRecord) -> bytes:
+    data = json.dumps(entry_fields(entry), separators=(",", ":")).encode()
+    return _HEADER.pack(len(data)) + data
+
+
+def load_entry(data: bytes) -> TrackRecord:
+    return entry_from_fields(json.loads(data))
+
+
+class SpillSegment:
+    """
+    Middle of a very large queue, kept on disk
+    - Append-only segment file (one per guild queue, deleted on close)
+    - In memory: only an int64 offset per entry
+    - Reads go through an mmap of the file
+    - Consumed records are reclaimed by background compaction
+    """
+
+    __slots__ = (
+        "_directory",
+        "_file",
+        "_size",
+        "_map",
+        "_offsets",
+        "_start",
+        "_written",
+        "_compacting",
+    )
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._file = tempfile.TemporaryFile(dir=directory, prefix="queue-", suffix=".seg")
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+        self._offsets = array("q")
+        self._start = 0  # offsets before this index were popped
+        self._written = 0  # records in the file (live + dead)
+        self._compacting: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - self._start
+
+    # ==================================================
+    # FILE I/O
+    # ==================================================
+    def _write(self, entries: Iterable[TrackRecord]) -> List[int]:
+        offsets = []
+        chunks = []
+        position = self._size
+        for entry in entries:
+            data = dump_entry(entry)
+            offsets.append(position)
+            chunks.append(data)
+            position += len(data)
+
+        os.pwrite(self._file.fileno(), b"".join(chunks), self._size)
+        self._size = position
+        self._written += len(offsets)
+        return offsets
+
+    def _read(self, offset: int) -> TrackRecord:
+        if self._map is None or offset + _HEADER.size > len(self._map):
+            self._remap()
+
+        (length,) = _HEADER.unpack_from(self._map, offset)
+        start = offset + _HEADER.size
+        if start + length > len(self._map):
+            self._remap()
+        return load_entry(self._map[start:start + length])
+
+    def _remap(self):
+        # The file only grows between compactions; map its current size
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+
+    # ==================================================
+    # QUEUE OPERATIONS
+    # ==================================================
+    def extend(self, entries: Iterable[TrackRecord]):
+        self._offsets.extend(self._write(entries))
+
+    def insert(self, index: int, entry: TrackRecord):
+        self._offsets.insert(self._start + index, self._write([entry])[0])
+
+    def get(self, index: int) -> TrackRecord:
+        return self._read(self._offsets[self._start + index])
+
+    def pop(self, index: int) -> TrackRecord:
+        position = self._start + index
+        entry = self._read(self._offsets[position])
+        if index == 0:
+            self._start += 1
+        else:
+            del self._offsets[position]
+        self._released()
+        return entry
+
+    def take(self, count: int) -> List[TrackRecord]:
+        """Pop up to count entries from the front"""
+        end = min(self._start + count, len(self._offsets))
+        entries = [self._read(self._offsets[i]) for i in range(self._start, end)]
+        self._start = end
+        self._released()
+        return entries
+
+    def __iter__(self) -> Iterator[TrackRecord]:
+        for i in range(self._start, len(self._offsets)):
+            yield self._read(self._offsets[i])
+
+    def refs(self) -> List[int]:
+        """Live offsets in queue order (shuffle works on these)"""
+        return self._offsets[self._start:].tolist()
+
+    def replace(self, offsets: Iterable[int], entries: Iterable[TrackRecord] = ()):
+        """New middle order: existing offsets followed by new entries"""
+        offsets = array("q", offsets)
+        offsets.extend(self._write(entries))
+        self._offsets = offsets
+        self._start = 0
+        self._released()
+
+    def write(self, entry: TrackRecord) -> int:
+        """Store an entry without queueing it; returns its offset"""
+        return self._write([entry])[0]
+
+    def read(self, offset: int) -> TrackRecord:
+        return self._read(offset)
+
+    # ==================================================
+    # COMPACTION
+    # ==================================================
+    def _released(self):
+        live = len(self)
+
+        # Everything consumed: reuse the file from the start
+        if live == 0 and not self._compacting:
+            self._reset()
+            return
+
+        if self._start > COMPACT_MIN_DEAD and self._start > live:
+            self._offsets = self._offsets[self._start:]
+            self._start = 0
+
+        if self._written - live > max(live, COMPACT_MIN_DEAD):
+            self._schedule_compaction()
+
+    def _reset(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.truncate(0)
+        self._size = 0
+        self._written = 0
+        self._offsets = array("q")
+        self._start = 0
+
+    def _schedule_compaction(self):
+        if self._compacting:
+            return
+        try:
+            self._compacting = asyncio.get_running_loop().create_task(self._compact())
+        except RuntimeError:
+            pass  # no event loop (offline tools): compact later
+
+    async def _compact(self):
+        old = self._file
+
+        try:
+            new, mapping = await asyncio.to_thread(
+                _copy_records, old, self.refs(), self._directory
+            )
+        except Exception as e:
+            print("[QUEUE SPILL ERROR]", e)
+            return
+        finally:
+            self._compacting = None
+
+        # Offsets not in the snapshot were appended meanwhile; copy them over
+        size = os.fstat(new.fileno()).st_size
+        offsets = array("q")
+        for offset in self.refs():
+            moved = mapping.get(offset)
+            if moved is None:
+                data = _read_record(old, offset)
+                os.pwrite(new.fileno(), data, size)
+                moved = size
+                size += len(data)
+            offsets.append(moved)
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        old.close()
+
+        self._file = new
+        self._size = size
+        self._offsets = offsets
+        self._start = 0
+        self._written = len(offsets)
+
+    def close(self):
+        if self._compacting:
+            self._compacting.cancel()
+            self._compacting = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        self._offsets = array("q")
+        self._start = 0
+
+
+def _read_record(file, offset: int) -> bytes:
+    header = os.pread(file.fileno(), _HEADER.size, offset)
+    (length,) = _HEADER.unpack(header)
+    return header + os.pread(file.fileno(), length, offset + _HEADER.size)
+
+
+def _copy_records(old, offsets: List[int], directory: str):
+    """Worker thread: write live records into a fresh segment file"""
+    new = tempfile.TemporaryFile(dir=directory, prefix="queue-", suffix=".seg")
+    mapping = {}
+    chunks = []
+    position = 0
+    for offset in offsets:
+        data = _read_record(old, offset)
+        mapping[offset] = position
+        chunks.append(data)
+        position += len(data)
+    os.pwrite(new.fileno(), b"".join(chunks), 0)
+    return new, mapping
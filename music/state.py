@@ -1,14 +1,33 @@
-from typing import List, Optional
+import asyncio
+from typing import Optional, Tuple
 import wavelink
 
+from core.config import AUTOPLAY_HISTORY_SIZE
+from music.events import (
+    ModeToggled,
+    QueueMutated,
+    SessionReset,
+    TrackChanged,
+    state_events,
+)
+from music.history import RecentHistory
+from music.queue import TrackQueue
+from music.track import TrackRecord
+
 
 class MusicState:
     """
     Production-grade music state container
     One instance per guild
+
+    Versioned: every visible change bumps `version` and publishes a
+    typed event on music.events.state_events (panel, metrics,
+    persistence subscribe there).
     """
 
     __slots__ = (
+        "guild_id",
+        "version",
         "player",
         "queue",
         "current",
@@ -16,29 +35,81 @@ class MusicState:
         "loop",
         "autoplay",
         "autoplay_seed",
+        "autoplay_next",
+        "autoplay_pool",
+        "recent",
         "message",
+        "panel",
+        "rendered",
+
+        # Per-guild playback actor (owns all transitions)
+        "actor",
 
-        # 🔥 REQUIRED FOR BACK / MANUAL ACTION FIX
-        "manual_action",
+        # Background playlist resolution
+        "resolve_task",
+        "resolve_progress",
+        "resolve_event",
     )
 
-    def __init__(self):
+    def __init__(self, guild_id: Optional[int] = None):
+        self.guild_id = guild_id
+        self.version = 0
+
         self.player: Optional[wavelink.Player] = None
-        self.queue: List[wavelink.Playable] = []
+        self.queue: TrackQueue = TrackQueue()
+        self.queue.on_change = self._queue_changed
 
         self.current: Optional[wavelink.Playable] = None
-        self.previous: Optional[wavelink.Playable] = None
+        # Compact record; rehydrated only if Back plays it again
+        self.previous: Optional[TrackRecord] = None
 
         self.loop: bool = False
         self.autoplay: bool = False
         self.autoplay_seed: Optional[wavelink.Playable] = None
 
-        # Unified control panel message
+        # 🔄 AUTOPLAY LOOK-AHEAD
+        # (seed key, background task, started_at) for the next pick
+        self.autoplay_next: Optional[tuple] = None
+        # Ranked candidates shared by consecutive autoplay picks
+        self.autoplay_pool = None
+        # Recently played tracks; autoplay never repeats these
+        self.recent = RecentHistory(AUTOPLAY_HISTORY_SIZE)
+
+        # Unified control panel message + its coalescing editor
         self.message = None
+        self.panel = None
+        # (render key, embed) of the last panel render (music.embed)
+        self.rendered: Optional[tuple] = None
+
+        # 🎛 PLAYBACK ACTOR
+        # Serializes play / skip / back / loop / autoplay / end
+        self.actor = None
+
+        # 📥 BACKGROUND RESOLVER
+        # (resolved, total) while a playlist is still being resolved
+        self.resolve_task: Optional[asyncio.Task] = None
+        self.resolve_progress: Optional[Tuple[int, int]] = None
+        self.resolve_event = asyncio.Event()
+
+    # ============================================================
+    # VERSION + CHANGE EVENTS
+    # ============================================================
+    def publish(self, event_type, *args):
+        """Bump the version and publish a change event"""
+        self.version += 1
+        state_events.publish(event_type(self.guild_id, self.version, *args))
+
+    def _queue_changed(self):
+        self.publish(QueueMutated, len(self.queue))
 
-        # 🔥 MANUAL ACTION FLAG
-        # Used to prevent autoplay after Back / Skip / Stop
-        self.manual_action: bool = False
+    def toggled(self, mode: str, value):
+        """Loop / autoplay flag or player pause / volume changed"""
+        self.publish(ModeToggled, mode, value)
+
+    def report_progress(self, progress: Optional[Tuple[int, int]]):
+        """Playlist resolution progress (shown in the panel)"""
+        self.resolve_progress = progress
+        self.publish(QueueMutated, len(self.queue))
 
     # ============================================================
     # STATE HELPERS
@@ -51,7 +122,64 @@ class MusicState:
         self.autoplay_seed = None
         self.loop = False
         self.autoplay = False
-        self.manual_action = None
+        self.cancel_resolve()
+        self.invalidate_autoplay()
+        if self.panel:
+            self.panel.cancel()
+        self.autoplay_pool = None
+        self.recent.clear()
+        self.rendered = None
+        self.publish(SessionReset)
+
+    def advance(self, track: wavelink.Playable):
+        """Make track current; the old current becomes previous"""
+        self.previous = TrackRecord.from_playable(self.current) if self.current else None
+        self.current = track
+        self.autoplay_seed = track
+        self.publish(TrackChanged, track)
+
+    def rewind(self, track: wavelink.Playable):
+        """Back: replay the previous track as current"""
+        # previous cleared so Back never ping-pongs between two tracks
+        self.previous = None
+        self.current = track
+        self.autoplay_seed = track
+        self.invalidate_autoplay()
+        self.publish(TrackChanged, track)
+
+    def cancel_resolve(self):
+        """Stop background playlist resolution (used on stop / leave)"""
+        if self.resolve_task and not self.resolve_task.done():
+            self.resolve_task.cancel()
+        self.resolve_task = None
+        self.resolve_event.set()
+        if self.resolve_progress is not None:
+            self.report_progress(None)
+
+    def invalidate_autoplay(self):
+        """Drop the precomputed autoplay pick (queue / seed changed)"""
+        if self.autoplay_next:
+            self.autoplay_next[1].cancel()
+        self.autoplay_next = None
+
+    def is_resolving(self) -> bool:
+        return self.resolve_task is not None and not self.resolve_task.done()
+
+    async def wait_for_queue(self, timeout: float) -> bool:
+        """
+        Wait for the background resolver to queue a track
+        Returns True if the queue is no longer empty
+        """
+        if self.queue or not self.is_resolving():
+            return bool(self.queue)
+
+        self.resolve_event.clear()
+        try:
+            await asyncio.wait_for(self.resolve_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        return bool(self.queue)
 
     def is_playing(self) -> bool:
         return self.player is not None and self.player.playing
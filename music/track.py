@@ -0,0 +1,161 @@
+from typing import Optional
+
+import wavelink
+from core.store import LRUCache
+
+REQUESTER_CACHE_SIZE = 10_000  # distinct requesters remembered for display
+
+
+# ============================================================
+# REQUESTER DIRECTORY (ONE ENTRY PER USER, NOT PER TRACK)
+# ============================================================
+_requesters = LRUCache(REQUESTER_CACHE_SIZE)
+
+
+def remember_requester(requester):
+    """Store a requester's display info once, keyed by user id"""
+    _requesters.set(
+        requester.id,
+        {
+            "requester_name": requester.display_name,
+            "requester_tag": requester.discriminator,
+            "requester_avatar": requester.display_avatar.url,
+        },
+    )
+
+
+def requester_extras(requester_id: Optional[int], autocorrected: bool = False) -> dict:
+    """Playable extras rebuilt from a requester id"""
+    if requester_id is None:
+        return {}
+
+    extras = dict(_requesters.get(requester_id) or {})
+    extras["requester_id"] = requester_id
+    extras["autocorrected"] = autocorrected
+    return extras
+
+
+class TrackRecord:
+    """
+    Compact queue entry for a resolved track
+    - Lavalink encoded string + the metadata the UI shows
+    - Requester kept as an id (display info lives in one shared directory)
+    - Rehydrated to a wavelink.Playable only when it is played
+    """
+
+    __slots__ = (
+        "encoded",
+        "identifier",
+        "title",
+        "author",
+        "length",
+        "uri",
+        "artwork",
+        "source",
+        "is_stream",
+        "requester_id",
+        "autocorrected",
+    )
+
+    def __init__(
+        self,
+        encoded: Optional[str],
+        identifier: Optional[str],
+        title: str,
+        author: str,
+        length: int,
+        uri: str = None,
+        artwork: str = None,
+        source: str = None,
+        is_stream: bool = False,
+        requester_id: int = None,
+        autocorrected: bool = False,
+    ):
+        self.encoded = encoded
+        self.identifier = identifier
+        self.title = title
+        self.author = author
+        self.length = length
+        self.uri = uri
+        self.artwork = artwork
+        self.source = source
+        self.is_stream = is_stream
+        self.requester_id = requester_id
+        self.autocorrected = autocorrected
+
+    @classmethod
+    def from_playable(cls, track: wavelink.Playable) -> "TrackRecord":
+        extras = track.extras
+        return cls(
+            track.encoded,
+            track.identifier,
+            track.title,
+            track.author,
+            track.length,
+            uri=track.uri,
+            artwork=track.artwork,
+            source=track.source,
+            is_stream=track.is_stream,
+            requester_id=getattr(extras, "requester_id", None),
+            autocorrected=getattr(extras, "autocorrected", False),
+        )
+
+    @property
+    def raw_data(self) -> dict:
+        """Lavalink track payload (enough for Playable and for playback)"""
+        return {
+            "encoded": self.encoded,
+            "info": {
+                "identifier": self.identifier,
+                "isSeekable": not self.is_stream,
+                "author": self.author,
+                "length": self.length,
+                "isStream": self.is_stream,
+                "position": 0,
+                "title": self.title,
+                "uri": self.uri,
+                "artworkUrl": self.artwork,
+                "isrc": None,
+                "sourceName": self.source,
+            },
+            "pluginInfo": {},
+            "userData": requester_extras(self.requester_id, self.autocorrected),
+        }
+
+    def to_playable(self) -> wavelink.Playable:
+        return wavelink.Playable(self.raw_data)
+
+
+class PendingTrack(TrackRecord):
+    """
+    Lightweight unresolved queue entry (Spotify metadata only)
+    Turned into a wavelink.Playable just in time by the resolver
+    (music.resolver.materialize)
+    """
+
+    __slots__ = ("spotify_id", "isrc", "task")
+
+    def __init__(
+        self,
+        title: str,
+        author: str,
+        length: int,
+        requester_id: int,
+        spotify_id: str = None,
+        isrc: str = None,
+    ):
+        super().__init__(None, None, title, author, length, requester_id=requester_id)
+        self.spotify_id = spotify_id
+        self.isrc = isrc
+        self.task = None  # background search, started near the queue head
+
+    @property
+    def search(self) -> str:
+        return f"ytmsearch:{self.title} {self.author}"
+
+
+def compact(entry):
+    """Queue form of an entry: Playables become TrackRecords"""
+    if isinstance(entry, wavelink.Playable):
+        return TrackRecord.from_playable(entry)
+    return entry
@@ -0,0 +1,102 @@
+import time
+from typing import Dict, Optional
+
+from core.config import TRANSITION_GAP_SLO_MS
+from core.metrics import Histogram
+
+CAUSES = ("queue", "loop", "autoplay", "cleanup")
+
+
+class GuildGaps:
+    """Per-guild transition timer + SLO counters"""
+
+    __slots__ = ("ended_at", "cause", "count", "breaches", "worst", "last")
+
+    def __init__(self):
+        self.ended_at: Optional[float] = None
+        self.cause: Optional[str] = None
+        self.count = 0
+        self.breaches = 0
+        self.worst = 0.0
+        self.last = 0.0
+
+
+class TransitionMonitor:
+    """
+    Dead air between a track ending and the next one starting
+    - Timer starts at the track end event, stops at the next track
+      start (or once cleanup finished)
+    - Gaps aggregated per cause: queue / loop / autoplay / cleanup
+    - Guilds whose gap exceeds slo_ms are counted as breaching
+      (per-guild counters live as long as the guild's session)
+    """
+
+    def __init__(self, slo_ms: float):
+        self.slo_ms = slo_ms
+        self.histograms = {cause: Histogram() for cause in CAUSES}
+        self.guilds: Dict[int, GuildGaps] = {}
+
+    def begin(self, guild_id: int, ended_at: float = None):
+        """Track ended naturally: start the guild's timer"""
+        gaps = self.guilds.get(guild_id)
+        if gaps is None:
+            gaps = self.guilds[guild_id] = GuildGaps()
+
+        gaps.ended_at = ended_at or time.monotonic()
+        gaps.cause = None
+
+    def cause(self, guild_id: int, cause: str):
+        """What filled the gap (set once the next step is decided)"""
+        gaps = self.guilds.get(guild_id)
+        if gaps and gaps.ended_at is not None:
+            gaps.cause = cause
+
+    def finish(self, guild_id: int, started_at: float = None) -> Optional[float]:
+        """Next track started (or session cleaned up): record the gap"""
+        gaps = self.guilds.get(guild_id)
+        if not gaps or gaps.ended_at is None or gaps.cause is None:
+            return None
+
+        gap = max(0.0, (started_at or time.monotonic()) - gaps.ended_at) * 1000
+        self.histograms[gaps.cause].observe(gap)
+
+        gaps.ended_at = None
+        gaps.count += 1
+        gaps.last = gap
+        gaps.worst = max(gaps.worst, gap)
+
+        if gap > self.slo_ms:
+            gaps.breaches += 1
+            print(f"[TRANSITION SLO] guild {guild_id}: {gap:.0f}ms of silence ({gaps.cause})")
+
+        return gap
+
+    def forget(self, guild_id: int):
+        """Session ended: drop the guild's timer + counters"""
+        self.guilds.pop(guild_id, None)
+
+    def breaching(self, limit: int = 10) -> list:
+        """Guilds with the most SLO breaches"""
+        guilds = [(gid, g) for gid, g in self.guilds.items() if g.breaches]
+        guilds.sort(key=lambda item: item[1].breaches, reverse=True)
+        return [
+            {
+                "guild_id": guild_id,
+                "breaches": gaps.breaches,
+                "transitions": gaps.count,
+                "worst_ms": gaps.worst,
+                "last_ms": gaps.last,
+            }
+            for guild_id, gaps in guilds[:limit]
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "slo_ms": self.slo_ms,
+            "gaps_ms": {cause: h.snapshot() for cause, h in self.histograms.items()},
+            "breaching": self.breaching(),
+        }
+
+
+# GLOBAL INSTANCE
+transition_monitor = TransitionMonitor(TRANSITION_GAP_SLO_MS)
@@ -1,5 +1,26 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import lyricsgenius
-from core.config import GENIUS_TOKEN
+from core.config import (
+    GENIUS_MAX_PENDING,
+    GENIUS_REQUEST_TIMEOUT,
+    GENIUS_TOKEN,
+    GENIUS_WORKERS,
+    LYRICS_CACHE_MEMORY_SIZE,
+    LYRICS_CACHE_NEGATIVE_TTL,
+    LYRICS_CACHE_PATH,
+    LYRICS_CACHE_TTL,
+    LYRICS_PREFETCH_SLOTS,
+)
+from core.metrics import Histogram
+from core.store import LRUCache, SQLiteStore
 
 # ============================================================
 # GENIUS CLIENT (PRODUCTION SAFE)
@@ -19,21 +40,246 @@ else:
         verbose=False,
     )
 
+
 # ============================================================
-# SAFE SEARCH WRAPPER
+# LYRICS WORKER POOL
 # ============================================================
+class LyricsWorkerPool:
+    """
+    Runs blocking Genius lookups off the event loop
+    - Dedicated bounded thread pool (never the loop's default executor)
+    - At most `max_pending` lookups queued or running at once
+    - Cancelled / timed-out requests are skipped if not yet started
+    - Records queue wait vs fetch time
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="genius",
+        )
+        self._slots = asyncio.Semaphore(max_pending)
+        self.workers = workers
+        self.pending = 0  # queued or running
+
+        self.queue_wait = Histogram()
+        self.fetch_time = Histogram()
+        self.cancelled = 0
+        self.errors = 0
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) on the pool
+        Raises TimeoutError on timeout and re-raises errors from fn
+        """
+        loop = asyncio.get_running_loop()
+        abandoned = threading.Event()
+        submitted = time.perf_counter()
+
+        def job():
+            if abandoned.is_set():
+                return None
+            started = time.perf_counter()
+            try:
+                return fn(*args), started, time.perf_counter()
+            except Exception as e:
+                return e, started, time.perf_counter()
+
+        self.pending += 1
+        try:
+            async with asyncio.timeout(self.timeout):
+                async with self._slots:
+                    outcome = await loop.run_in_executor(self._executor, job)
+        except (asyncio.CancelledError, TimeoutError):
+            abandoned.set()
+            self.cancelled += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        result, started, finished = outcome
+        self.queue_wait.observe((started - submitted) * 1000)
+        self.fetch_time.observe((finished - started) * 1000)
+
+        if isinstance(result, Exception):
+            self.errors += 1
+            raise result
+
+        return result
+
+    def idle(self) -> bool:
+        """A worker is free right now"""
+        return self.pending < self.workers
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "queue_wait_ms": self.queue_wait.snapshot(),
+            "fetch_ms": self.fetch_time.snapshot(),
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+        }
+
+
+# GLOBAL INSTANCE
+lyrics_pool = LyricsWorkerPool(
+    GENIUS_WORKERS,
+    max_pending=GENIUS_MAX_PENDING,
+    timeout=GENIUS_REQUEST_TIMEOUT,
+)
+
+
+# ============================================================
+# LYRICS CACHE (MEMORY LRU + COMPRESSED DISK)
+# ============================================================
+class Lyrics:
+    """Cached lyrics result (same fields /lyrics reads from a Song)"""
+
+    __slots__ = ("title", "lyrics")
+
+    def __init__(self, title: str, lyrics: str):
+        self.title = title
+        self.lyrics = lyrics
+
+
+_NOT_FOUND = ""  # memory-tier marker for cached negative results
+
 
+def lyrics_key(title: str, artist: str) -> str:
+    """Case-folded title + artist, without (...) / [...] decorations"""
+    text = f"{title} {artist or ''}".casefold()
+    text = re.sub(r"[\(\[][^\)\]]*[\)\]]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
 
-def search_lyrics(title: str, artist: str):
+
+class LyricsCache:
     """
-    Safe Genius lyrics search wrapper
-    Returns None on failure instead of crashing the bot
+    Two-tier lyrics cache
+    - In-memory LRU in front of zlib-compressed SQLite rows
+    - Misses (no lyrics) are cached with a shorter TTL
+    - Concurrent lookups for the same song share one Genius request
+    - Prefetch is low priority: at most LYRICS_PREFETCH_SLOTS at once,
+      and skipped while the worker pool has no idle worker
     """
-    if not genius:
-        return None
-
-    try:
-        return genius.search_song(title, artist)
-    except Exception as e:
-        print("[GENIUS ERROR]", e)
-        return None
+
+    def __init__(self, path: str, memory_size: int, ttl: float, negative_ttl: float):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._memory = LRUCache(memory_size)
+        self._disk = SQLiteStore(path, "lyrics")
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._prefetching: set[asyncio.Task] = set()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.prefetches = 0
+        self.prefetch_skipped = 0
+
+    async def get(self, title: str, artist: str) -> Optional[Lyrics]:
+        if not genius:
+            return None
+
+        key = lyrics_key(title, artist)
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            self.memory_hits += 1
+            return cached or None
+
+        return await asyncio.shield(self._start(key, title, artist))
+
+    def _start(self, key: str, title: str, artist: str) -> asyncio.Task:
+        """The in-flight load for key (started if there is none)"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, title, artist))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def prefetch(self, title: str, artist: str):
+        """Warm the cache in the background (no-op if cached or busy)"""
+        if not genius:
+            return
+
+        key = lyrics_key(title, artist)
+        if self._memory.get(key) is not None or key in self._inflight:
+            return
+
+        # Interactive /lyrics always goes first
+        if len(self._prefetching) >= LYRICS_PREFETCH_SLOTS or not lyrics_pool.idle():
+            self.prefetch_skipped += 1
+            return
+
+        self.prefetches += 1
+        task = self._start(key, title, artist)
+        self._prefetching.add(task)
+        task.add_done_callback(self._prefetch_done)
+
+    def _prefetch_done(self, task: asyncio.Task):
+        self._prefetching.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print("[LYRICS PREFETCH ERROR]", task.exception())
+
+    async def _load(self, key: str, title: str, artist: str) -> Optional[Lyrics]:
+        try:
+            row = await asyncio.to_thread(self._disk.get_with_expiry, key)
+        except Exception as e:
+            print("[LYRICS CACHE ERROR]", e)
+            row = None
+
+        if row is not None:
+            value, expires_at = row
+            data = json.loads(zlib.decompress(value)) if value else None
+            result = Lyrics(data["title"], data["lyrics"]) if data else None
+
+            self._memory.set(key, result or _NOT_FOUND, expires_at)
+            self.disk_hits += 1
+            return result
+
+        self.misses += 1
+        try:
+            song = await lyrics_pool.run(genius.search_song, title, artist)
+        except Exception as e:
+            # Timeouts / errors are not cached
+            print("[GENIUS ERROR]", e)
+            return None
+
+        result = Lyrics(song.title, song.lyrics) if song and song.lyrics else None
+        ttl = self.ttl if result else self.negative_ttl
+        self._memory.set(key, result or _NOT_FOUND, time.time() + ttl)
+
+        value = b""
+        if result:
+            value = zlib.compress(
+                json.dumps({"title": result.title, "lyrics": result.lyrics}).encode()
+            )
+
+        try:
+            await asyncio.to_thread(self._disk.set, key, value, ttl)
+        except Exception as e:
+            print("[LYRICS CACHE ERROR]", e)
+
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "prefetches": self.prefetches,
+            "prefetch_skipped": self.prefetch_skipped,
+            "memory_entries": len(self._memory),
+        }
+
+
+# GLOBAL INSTANCE
+lyrics_cache = LyricsCache(
+    LYRICS_CACHE_PATH,
+    memory_size=LYRICS_CACHE_MEMORY_SIZE,
+    ttl=LYRICS_CACHE_TTL,
+    negative_ttl=LYRICS_CACHE_NEGATIVE_TTL,
+)
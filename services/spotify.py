@@ -1,7 +1,192 @@
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
+import asyncio
+import time
+from typing import List, Optional
+
+import aiohttp
 from core.config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
 
+API_BASE = "https://api.spotify.com/v1"
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+
+class SpotifyError(Exception):
+    """Raised when the Spotify Web API keeps failing after retries"""
+
+
+class SpotifyClient:
+    """
+    Non-blocking Spotify Web API client (client-credentials flow)
+    - One pooled aiohttp session, created lazily on the running loop
+    - Access token cached until shortly before it expires
+    - 429 responses honor Retry-After; 5xx responses back off
+    - api_base / token_url can point at a local stub server
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        *,
+        api_base: str = API_BASE,
+        token_url: str = TOKEN_URL,
+        timeout: float = 10,
+        retries: int = 3,
+        pool_size: int = 20,
+        max_retry_after: float = 30,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_base = api_base.rstrip("/")
+        self.token_url = token_url
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.max_retry_after = max_retry_after
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+
+    # ==================================================
+    # CONNECTION POOL
+    # ==================================================
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ==================================================
+    # TOKEN CACHE
+    # ==================================================
+    async def _access_token(self) -> str:
+        if self._token and time.monotonic() < self._token_expires:
+            return self._token
+
+        async with self._token_lock:
+            # Another caller may have refreshed while we waited
+            if self._token and time.monotonic() < self._token_expires:
+                return self._token
+
+            async with self._get_session().post(
+                self.token_url,
+                data={"grant_type": "client_credentials"},
+                auth=aiohttp.BasicAuth(self.client_id, self.client_secret),
+            ) as resp:
+                if resp.status != 200:
+                    raise SpotifyError(f"token request failed ({resp.status})")
+                data = await resp.json()
+
+            self._token = data["access_token"]
+            # Refresh a minute early so in-flight requests never expire
+            self._token_expires = time.monotonic() + max(0, data.get("expires_in", 3600) - 60)
+            return self._token
+
+    # ==================================================
+    # REQUEST (RETRY-AFTER AWARE)
+    # ==================================================
+    async def get(self, path: str, params: dict = None) -> dict:
+        """GET an API path (or an absolute `next` URL)"""
+        url = path if path.startswith("http") else f"{self.api_base}/{path.lstrip('/')}"
+
+        for attempt in range(self.retries + 1):
+            token = await self._access_token()
+
+            try:
+                async with self._get_session().get(
+                    url,
+                    params=params,
+                    headers={"Authorization": f"Bearer {token}"},
+                ) as resp:
+                    if resp.status == 200:
+                        return await resp.json()
+
+                    if resp.status == 401:
+                        self._token = None
+                        continue
+
+                    if resp.status == 429:
+                        delay = float(resp.headers.get("Retry-After", 1))
+                        if delay > self.max_retry_after:
+                            raise SpotifyError(f"rate limited for {delay}s")
+                        await asyncio.sleep(delay)
+                        continue
+
+                    if resp.status < 500:
+                        raise SpotifyError(f"GET {url} failed ({resp.status})")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise SpotifyError(str(e)) from e
+
+            await asyncio.sleep(min(2 ** attempt * 0.5, 5))
+
+        raise SpotifyError(f"GET {url} failed after {self.retries} retries")
+
+    async def _pages(self, path: str, params: dict, max_items: int):
+        """
+        Yield (items, total) page by page, following `next`
+        total: the listing's size, capped at max_items
+        """
+        seen = 0
+        page = await self.get(path, params)
+
+        while page:
+            items = page.get("items", [])[: max_items - seen]
+            seen += len(items)
+            yield items, min(page.get("total") or seen, max_items)
+
+            if seen >= max_items or not page.get("next"):
+                break
+
+            page = await self.get(page["next"])
+
+    # ==================================================
+    # ENDPOINTS
+    # ==================================================
+    async def playlist_pages(self, playlist_id: str, max_items: int):
+        """Playlist track objects, one page (100) at a time"""
+        async for items, total in self._pages(
+            f"playlists/{playlist_id}/tracks",
+            {"limit": 100, "additional_types": "track"},
+            max_items,
+        ):
+            yield [
+                item["track"] for item in items
+                if item.get("track") and item["track"].get("name")
+            ], total
+
+    async def tracks(self, track_ids: List[str]) -> List[dict]:
+        """Full track objects via the batch endpoint (50 ids per call)"""
+        tracks = []
+        for start in range(0, len(track_ids), 50):
+            data = await self.get(
+                "tracks",
+                {"ids": ",".join(track_ids[start:start + 50])},
+            )
+            tracks.extend(t for t in data.get("tracks", []) if t)
+        return tracks
+
+    async def album_pages(self, album_id: str, max_items: int):
+        """Full album track objects (with ISRCs), one page (50) at a time"""
+        async for items, total in self._pages(
+            f"albums/{album_id}/tracks",
+            {"limit": 50},
+            max_items,
+        ):
+            yield await self.tracks([t["id"] for t in items if t.get("id")]), total
+
+
 # ============================================================
 # VALIDATE CREDENTIALS
 # ============================================================
@@ -9,28 +194,58 @@ if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
     spotify = None
     print("⚠️ Spotify credentials not found. Spotify features disabled.")
 else:
-    spotify = spotipy.Spotify(
-        auth_manager=SpotifyClientCredentials(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET,
-        ),
-        requests_timeout=10,
-        retries=3,
-    )
+    spotify = SpotifyClient(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET)
+
+
+# ============================================================
+# PLAYLIST ITEMS (PAGINATED)
+# ============================================================
+async def spotify_playlist_pages(playlist_id: str, max_items: int):
+    """
+    Yield (track objects, total) per playlist page
+    Stops quietly on failure
+    """
+    if not spotify:
+        return
+
+    try:
+        async for page in spotify.playlist_pages(playlist_id, max_items):
+            yield page
+    except Exception as e:
+        print("[SPOTIFY ERROR]", e)
+
+
+# ============================================================
+# TRACKS (BATCH ENDPOINT, 50 IDS PER CALL)
+# ============================================================
+async def spotify_tracks(track_ids):
+    """
+    Fetch full track objects in batches
+    Returns [] on failure
+    """
+    if not spotify:
+        return []
+
+    try:
+        return await spotify.tracks(list(track_ids))
+    except Exception as e:
+        print("[SPOTIFY ERROR]", e)
+        return []
 
 
 # ============================================================
-# SAFE SEARCH WRAPPER
+# ALBUM TRACKS (PAGINATED + BATCH)
 # ============================================================
-def spotify_search(*args, **kwargs):
+async def spotify_album_pages(album_id: str, max_items: int):
     """
-    Safe Spotify API wrapper to prevent bot crash
+    Yield (track objects, total) per album page
+    Stops quietly on failure
     """
     if not spotify:
-        return None
+        return
 
     try:
-        return spotify.search(*args, **kwargs)
+        async for page in spotify.album_pages(album_id, max_items):
+            yield page
     except Exception as e:
         print("[SPOTIFY ERROR]", e)
-        return None